@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from config import Config
+
+# Rough prompt size estimates, made before any XML is scraped
+CHARS_PER_TOKEN = 4
+SYSTEM_PROMPT_TOKENS = 500
+# scrape_xml_content keeps at most 8000 characters of bill text per card
+XML_CARD_TOKENS = 8000 // CHARS_PER_TOKEN
+
+# Idle users whose buckets are full are dropped once there are this many
+MAX_TRACKED_USERS = 10000
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request can't be admitted now; carries the HTTP status and
+    Retry-After seconds (None when retrying the same request can't succeed)
+    """
+
+    def __init__(self, message, retry_after, status=429):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999)) if retry_after is not None else None
+        self.status = status
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= amount
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class FairScheduler:
+    """
+    A fixed number of slots shared by all users. When every slot is busy,
+    requests wait in per-user queues and freed slots are handed out round
+    robin across users, so one user with many requests can't starve others.
+    """
+
+    def __init__(self, slots, max_queue, max_queue_per_user):
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self._lock = threading.Lock()
+        self._free = slots
+        self._slots = slots
+        self._queues = OrderedDict()  # user -> deque of waiting Events
+        self._queued = 0
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self._avg_service = 2.0
+
+    def _estimated_wait(self):
+        return self._avg_service * (self._queued + 1) / self._slots
+
+    def acquire(self, user, timeout):
+        with self._lock:
+            if self._free > 0 and not self._queued:
+                self._free -= 1
+                return
+            user_queue = self._queues.get(user)
+            if self._queued >= self.max_queue:
+                raise AdmissionRejected("Server is busy, please try again shortly", self._estimated_wait())
+            if user_queue is not None and len(user_queue) >= self.max_queue_per_user:
+                raise AdmissionRejected("Too many requests in progress", self._estimated_wait())
+            waiter = threading.Event()
+            if user_queue is None:
+                user_queue = self._queues[user] = deque()
+            user_queue.append(waiter)
+            self._queued += 1
+
+        if waiter.wait(timeout):
+            return
+        with self._lock:
+            if waiter.is_set():
+                # The slot was handed over just as we timed out
+                return
+            user_queue.remove(waiter)
+            self._queued -= 1
+            if not user_queue:
+                del self._queues[user]
+            raise AdmissionRejected("Server is busy, please try again shortly", self._estimated_wait())
+
+    def release(self, held_for):
+        with self._lock:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * held_for
+            if not self._queued:
+                self._free += 1
+                return
+            # Hand the slot straight to the next user in round-robin order
+            user, user_queue = next(iter(self._queues.items()))
+            waiter = user_queue.popleft()
+            self._queued -= 1
+            if user_queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            waiter.set()
+
+
+class AdmissionController:
+    """Per-user request and prompt-token rate limits plus fair scheduling of LLM slots"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._request_buckets = {}
+        self._token_buckets = {}
+        self.scheduler = FairScheduler(Config.CHAT_MAX_CONCURRENT, Config.CHAT_QUEUE_MAX,
+                                       Config.CHAT_QUEUE_PER_USER)
+
+    def _buckets(self, user):
+        if user not in self._request_buckets:
+            if len(self._request_buckets) >= MAX_TRACKED_USERS:
+                self._prune()
+            self._request_buckets[user] = TokenBucket(Config.CHAT_REQUESTS_PER_MINUTE / 60.0,
+                                                      Config.CHAT_REQUEST_BURST)
+            self._token_buckets[user] = TokenBucket(Config.CHAT_TOKENS_PER_MINUTE / 60.0,
+                                                    Config.CHAT_TOKENS_PER_MINUTE)
+        return self._request_buckets[user], self._token_buckets[user]
+
+    def _prune(self):
+        now = time.monotonic()
+        for user in [u for u, bucket in self._request_buckets.items()
+                     if bucket.is_full(now) and self._token_buckets[u].is_full(now)]:
+            del self._request_buckets[user]
+            del self._token_buckets[user]
+
+    def check_request(self, user):
+        """Count one request against the user's request rate"""
+        with self._lock:
+            bucket, _ = self._buckets(user)
+            wait = bucket.wait_time(1, time.monotonic())
+            if wait > 0:
+                raise AdmissionRejected("Too many requests, please slow down", wait)
+            bucket.consume(1)
+
+    @contextmanager
+    def admit(self, user, prompt_tokens):
+        """Charge the user's prompt-token budget and hold an LLM slot for the duration"""
+        if prompt_tokens > Config.CHAT_MAX_PROMPT_TOKENS:
+            raise AdmissionRejected("Request is too large, try a shorter chat history or fewer bills", None, status=413)
+        with self._lock:
+            _, bucket = self._buckets(user)
+            wait = bucket.wait_time(prompt_tokens, time.monotonic())
+            if wait > 0:
+                raise AdmissionRejected("Too many messages, please slow down", wait)
+            bucket.consume(prompt_tokens)
+
+        try:
+            self.scheduler.acquire(user, Config.CHAT_MAX_WAIT_SECONDS)
+        except AdmissionRejected:
+            # Nothing was sent to the LLM, so give the tokens back
+            with self._lock:
+                bucket.consume(-prompt_tokens)
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.scheduler.release(time.monotonic() - started)
+
+
+def estimate_prompt_tokens(message, chat_history, context):
+    """Approximate prompt size of a chatbot request before the bill text is scraped"""
+    chars = len(message or '')
+    chars += sum(len(str(msg.get('text', ''))) for msg in chat_history or [])
+    chars += len(str(context.get('demographics', '')))
+    tokens = SYSTEM_PROMPT_TOKENS + chars // CHARS_PER_TOKEN
+    for card in context.get('contextCards', []):
+        if card.get('xml link'):
+            tokens += XML_CARD_TOKENS
+        else:
+            tokens += (len(str(card.get('title', ''))) + len(str(card.get('description', '')))) // CHARS_PER_TOKEN
+    return tokens
+
+
+chat_admission = AdmissionController()
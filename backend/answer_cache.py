@@ -0,0 +1,175 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# This will be set when the app starts
+_db = None
+
+CACHE_COLLECTION = 'answer_cache'
+
+# Max number of bills kept in the in-process cache
+MAX_CACHED_BILLS = 500
+
+# Filler words that don't change what is being asked
+STOPWORDS = {
+    'a', 'an', 'the', 'this', 'that', 'these', 'those', 'it', 'its', 'is', 'are',
+    'was', 'be', 'to', 'of', 'for', 'in', 'on', 'and', 'or', 'me', 'my', 'i', 'you',
+    'your', 'can', 'could', 'would', 'will', 'please', 'pls', 'tell', 'about', 'us',
+    'do', 'does', 'just', 'some', 'hey', 'hi', 'so', 'bit', 'little'
+}
+
+# Normalized forms of "explain this bill" style questions, answered by the
+# precomputed explainer stored on the bill
+EXPLAIN_QUESTIONS = {
+    'explain',
+    'summarize',
+    'summary',
+    'bill',
+    'bill explain',
+    'bill what',
+    'bill mean what',
+    'bill summarize',
+    'bill summary',
+    'bill give summary',
+    'bill break down',
+    'bill simple term what',
+    'bill explain simple term',
+    'bill explain language plain',
+}
+
+_lock = threading.Lock()
+# bill_id -> {(profile, normalized question): {"version": ..., "response": ...}}
+_memory_cache = OrderedDict()
+
+
+def init_answer_cache(db_instance):
+    """Initialize the database instance for the answer cache"""
+    global _db
+    _db = db_instance
+
+
+def _stem(token):
+    """Very light plural stripping so 'bills' and 'bill' match"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def normalize_question(question):
+    """Reduce a question to a sorted, de-duplicated set of meaningful tokens"""
+    words = re.findall(r"[a-z0-9$]+", (question or '').lower())
+    tokens = {_stem(w) for w in words if w not in STOPWORDS}
+    return ' '.join(sorted(tokens))
+
+
+def is_explain_question(question):
+    """Whether the question is a generic request to explain the bill"""
+    return normalize_question(question) in EXPLAIN_QUESTIONS
+
+
+def profile_key(demographics):
+    """
+    Short hash of the user's demographics. Answers are personalized with the
+    demographics in the prompt, so they are only reused for the same profile.
+    """
+    if isinstance(demographics, dict):
+        demographics = {field: sorted(values) if isinstance(values, list) else values
+                        for field, values in demographics.items() if values}
+    if not demographics:
+        return ''
+    encoded = json.dumps(demographics, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def _cache_doc_id(bill_id, profile, normalized):
+    digest = hashlib.sha1(f"{profile}|{normalized}".encode('utf-8')).hexdigest()[:16]
+    return f"{bill_id}_{digest}"
+
+
+def _bill_entries(bill_id):
+    """Return the cached answers for a bill, loading them from Firestore on first use"""
+    with _lock:
+        if bill_id in _memory_cache:
+            _memory_cache.move_to_end(bill_id)
+            return _memory_cache[bill_id]
+
+    entries = {}
+    if _db is not None:
+        try:
+            docs = _db.collection(CACHE_COLLECTION).where('bill_id', '==', bill_id).stream()
+            for doc in docs:
+                data = doc.to_dict()
+                entries[(data.get('profile', ''), data.get('question', ''))] = {
+                    'version': data.get('version'),
+                    'response': data.get('response')
+                }
+        except Exception as e:
+            print(f"Error loading answer cache for bill {bill_id}: {e}")
+
+    with _lock:
+        _memory_cache[bill_id] = entries
+        while len(_memory_cache) > MAX_CACHED_BILLS:
+            _memory_cache.popitem(last=False)
+    return entries
+
+
+def get_cached_answer(bill_id, version, question, profile=''):
+    """
+    Look up an answer for a question about a bill. Only exact matches of the
+    normalized question are reused: questions that differ by a single state,
+    number or "not" would otherwise share an answer. Entries from another
+    text version of the bill or another demographic profile are ignored.
+    """
+    normalized = normalize_question(question)
+    if not bill_id or not normalized:
+        return None
+
+    entry = _bill_entries(bill_id).get((profile, normalized))
+    if entry and entry['version'] == version:
+        return entry['response']
+    return None
+
+
+def store_answer(bill_id, version, question, response, profile=''):
+    """Cache an answer for a bill's current text version and a demographic profile"""
+    normalized = normalize_question(question)
+    if not bill_id or not normalized or not response:
+        return
+
+    entries = _bill_entries(bill_id)
+    with _lock:
+        entries[(profile, normalized)] = {'version': version, 'response': response}
+
+    if _db is not None:
+        try:
+            _db.collection(CACHE_COLLECTION).document(_cache_doc_id(bill_id, profile, normalized)).set({
+                'bill_id': bill_id,
+                'profile': profile,
+                'question': normalized,
+                'version': version,
+                'response': response,
+                'created_at': datetime.now()
+            })
+        except Exception as e:
+            print(f"Error saving cached answer for bill {bill_id}: {e}")
+
+
+def invalidate_bill(bill_id, current_version=None):
+    """Drop cached answers for a bill that don't belong to current_version"""
+    with _lock:
+        entries = _memory_cache.get(bill_id)
+        if entries is not None:
+            for key in [k for k, e in entries.items() if e['version'] != current_version]:
+                del entries[key]
+
+    if _db is not None:
+        try:
+            docs = _db.collection(CACHE_COLLECTION).where('bill_id', '==', bill_id).stream()
+            for doc in docs:
+                if doc.to_dict().get('version') != current_version:
+                    doc.reference.delete()
+        except Exception as e:
+            print(f"Error invalidating answer cache for bill {bill_id}: {e}")
@@ -7,7 +7,15 @@ from flask_cors import CORS
 from groq import Groq
 from dotenv import load_dotenv
 
-from chatbot_api import chatbot_bp
+from chatbot_api import chatbot_bp, generate_bill_explainer, scrape_xml_content, update_bill_explainer
+from answer_cache import init_answer_cache, invalidate_bill
+from search_index import search_bp, index_bill
+from bulk_import import bill_document_id
+from bill_versions import versions_bp, init_bill_versions, record_version, describe_changes, WHOLE_DOCUMENT_KEY
+from compression import init_compression
+from profiling import init_profiling, profile_phase
+from demographic_rules import CATEGORY_FIELDS, STATES, extract_demographics, init_demographic_rules, keyword_hints, record_agreement
+from config import Config
 # from chatbot_websocket import register_chatbot_websockets
 # from flask_socketio import SocketIO
 
@@ -17,6 +25,8 @@ from firebase_admin import credentials, firestore
 from datetime import datetime
 import json
 import re
+import base64
+import random
 
 cred = credentials.Certificate("billfinder-28004-firebase-adminsdk-fbsvc-45403f54e0.json")
 firebase_admin.initialize_app(cred)
@@ -33,161 +43,212 @@ CORS(app)
 # Initialize chatbot with db instance
 from chatbot_api import init_chatbot_db
 init_chatbot_db(db)
+init_answer_cache(db)
+init_bill_versions(db)
+init_demographic_rules(db)
 
 app.register_blueprint(chatbot_bp)
+app.register_blueprint(search_bp)
+app.register_blueprint(versions_bp)
+init_compression(app)
+init_profiling(app)
 # register_chatbot_websockets(socketio)
  # Enable CORS for frontend-backend communication
 
 # Initialize Groq client
 groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
-# Firestore query functions
-def query_bills_by_demographics(demographics):
+# Fields every bill in the /api/data response can carry. Clients can ask for a
+# subset with ?fields=id,title,... so list views don't pull the full analysis.
+BILL_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'update_date',
+    'categorized_populations',
+    'population_affect_summary',
+    'bill_number',
+    'xml link'
+]
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+# Upper bound on documents scanned per demographic page so a narrow filter
+# can't walk the whole collection in one request
+MAX_SCAN_PER_PAGE = 500
+SCAN_BATCH_SIZE = 100
+
+
+def parse_bill_demographics(demographics_data):
+    """Return a bill's stored demographics as a dict, whether stored as a dict or a JSON string"""
+    if isinstance(demographics_data, dict):
+        return demographics_data
+    if not isinstance(demographics_data, str) or not demographics_data:
+        return None
+    try:
+        return json.loads(demographics_data)
+    except json.JSONDecodeError:
+        # If it's not valid JSON, try to extract JSON from the string
+        json_match = re.search(r'\{.*\}', demographics_data, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+    return None
+
+
+def parse_fields(fields_param):
+    """Parse the ?fields= projection into a list of known bill fields (None means all)"""
+    if not fields_param:
+        return None
+    requested = [f.strip() for f in fields_param.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in BILL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Always include the id so clients can fetch details later
+    if 'id' not in requested:
+        requested.insert(0, 'id')
+    return requested
+
+
+def encode_cursor(last_bill_id):
+    """Build an opaque pagination cursor pointing after the given bill"""
+    payload = json.dumps({'after': last_bill_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the bill id a cursor points after, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(payload['after'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def serialize_bill(bill_id, bill_data, fields=None):
     """
-    Query Firestore for bills that match the provided demographics.
-    Returns up to 10 bills that have at least one matching demographic field.
+    Convert a Firestore bill document into the /api/data wire format.
+    Demographics are sent once (categorized_populations) and only the
+    requested fields are included when a projection is given.
     """
-    try:
-        # Get all bills from Firestore ordered by timestamp (most recent first)
-        # If timestamp doesn't exist, fall back to document ID ordering
-        bills_ref = db.collection('bills')
-        try:
-            bills = bills_ref.order_by('date', direction=firestore.Query.DESCENDING).limit(100).stream()
-            print("Using date ordering")
-        except Exception as e:
-            print(f"Date ordering failed: {e}, using fallback")
-            # Fallback if date field doesn't exist
-            bills = bills_ref.limit(100).stream()
-        
-        matching_bills = []
-        
-        for bill_doc in bills:
-            bill_data = bill_doc.to_dict()
-            bill_id = bill_doc.id
-            
-            # Check if bill matches user demographics
-            has_match = False
-            if any(demographics.values()):  # If user provided any demographics
-                # Try to get demographic data from demographics field
-                bill_demographics = None
-                if 'demographics' in bill_data and bill_data['demographics']:
-                    demographics_data = bill_data['demographics']
-                    
-                    # Handle both string and dict formats
-                    if isinstance(demographics_data, str):
-                        try:
-                            import json
-                            bill_demographics = json.loads(demographics_data)
-                        except json.JSONDecodeError:
-                            # If it's not valid JSON, try to extract JSON from the string
-                            import re
-                            json_match = re.search(r'\{.*\}', demographics_data, re.DOTALL)
-                            if json_match:
-                                try:
-                                    bill_demographics = json.loads(json_match.group())
-                                except json.JSONDecodeError:
-                                    pass
-                    elif isinstance(demographics_data, dict):
-                        bill_demographics = demographics_data
-                
-                if bill_demographics:
-                    # Check each demographic field for matches (excluding other_groups)
-                    for field, user_values in demographics.items():
-                        if field == 'other_groups':
-                            continue  # Skip other_groups as requested
-                            
-                        if field in bill_demographics:
-                            bill_values = bill_demographics[field] if isinstance(bill_demographics[field], list) else [bill_demographics[field]]
-                            user_values_list = user_values if isinstance(user_values, list) else [user_values]
-                            
-                            # Only include bills that have matching demographic data
-                            if bill_values and any(bill_values):  # Check if not empty
-                                if any(value in bill_values for value in user_values_list):
-                                    has_match = True
-                                    break
-                            # If bill has no demographic data for this field, do NOT include it
-                            # (only include bills with specific demographic targeting)
-                            else:
-                                has_match = False
-                                break
+    getters = {
+        'id': lambda: bill_id,
+        'title': lambda: bill_data.get('title', 'No title available'),
+        'description': lambda: bill_data.get('summary', 'No description available'),
+        # Use latest action date if available, otherwise use regular date
+        'update_date': lambda: bill_data.get('latest action date') or bill_data.get('date', 'N/A'),
+        'categorized_populations': lambda: bill_data.get('demographics', ''),
+        'population_affect_summary': lambda: bill_data.get('population affect summary', 'No population analysis available'),
+        'bill_number': lambda: bill_id,
+        'xml link': lambda: bill_data.get('xml link', '')
+    }
+    return {field: getters[field]() for field in (fields or BILL_FIELDS)}
+
+
+def bill_matches_demographics(bill_data, demographics):
+    """Check whether a bill targets at least one of the user's demographic values"""
+    if not any(demographics.values()):
+        # If no user demographics, include all bills
+        return True
+
+    bill_demographics = parse_bill_demographics(bill_data.get('demographics'))
+    if not bill_demographics:
+        return False
+
+    # Check each demographic field for matches (excluding other_groups)
+    for field, user_values in demographics.items():
+        if field == 'other_groups':
+            continue  # Skip other_groups as requested
+
+        if field in bill_demographics:
+            bill_values = bill_demographics[field] if isinstance(bill_demographics[field], list) else [bill_demographics[field]]
+            user_values_list = user_values if isinstance(user_values, list) else [user_values]
+
+            # Only include bills that have matching demographic data
+            if bill_values and any(bill_values):  # Check if not empty
+                if any(value in bill_values for value in user_values_list):
+                    return True
+            # If bill has no demographic data for this field, do NOT include it
+            # (only include bills with specific demographic targeting)
             else:
-                # If no user demographics, include all bills
-                has_match = True
-            
-            if has_match:
-                # Use latest action date if available, otherwise use regular date
-                latest_action_date = bill_data.get('latest action date', 'N/A')
-                
-                matching_bills.append({
-                    'id': bill_id,
-                    'title': bill_data.get('title', 'No title available'),
-                    'description': bill_data.get('summary', 'No description available'),
-                    'update_date': latest_action_date,
-                    'affected_populations_summary': bill_data.get('demographics', ''),
-                    'categorized_populations': bill_data.get('demographics', ''),
-                    'population_affect_summary': bill_data.get('population affect summary', 'No population analysis available'),
-                    'bill_number': bill_id, 
-                    'xml link': bill_data.get('xml link', '')
-                })
-                
-                # Stop at 10 bills
-                if len(matching_bills) >= 10:
-                    break
-        
-        return matching_bills
-        
-    except Exception as e:
-        print(f"Error querying Firestore: {str(e)}")
-        return []
+                return False
+    return False
+
 
-def get_top_10_bills():
+def _cursor_snapshot(after_id):
+    """Snapshot of the bill a client cursor points at (None for the first page)"""
+    if not after_id:
+        return None
+    snapshot = db.collection('bills').document(after_id).get()
+    if not snapshot.exists:
+        raise ValueError("Invalid cursor")
+    return snapshot
+
+
+def _ordered_bills_query(after_snapshot=None):
+    """Bills ordered by date (most recent first), starting after the given bill snapshot"""
+    query = db.collection('bills').order_by('date', direction=firestore.Query.DESCENDING)
+    if after_snapshot is not None:
+        query = query.start_after(after_snapshot)
+    return query
+
+
+# Firestore query functions
+def query_bills_by_demographics(demographics, limit=DEFAULT_PAGE_SIZE, after_id=None, fields=None):
     """
-    Get the top 10 bills from Firestore (most recent by timestamp).
+    Query Firestore for bills that match the provided demographics.
+    Returns (bills, next_cursor) with up to `limit` bills that have at least
+    one matching demographic field. next_cursor is None on the last page.
     """
-    try:
-        bills_ref = db.collection('bills')
-        print(f"Querying Firestore collection 'bills'...")
-        
-        try:
-            bills = bills_ref.order_by('date', direction=firestore.Query.DESCENDING).limit(10).stream()
-            print("Using date ordering")
-        except Exception as e:
-            print(f"Date ordering failed: {e}, using fallback")
-            # Fallback if date field doesn't exist
-            bills = bills_ref.limit(10).stream()
-        
-        top_bills = []
-        bill_count = 0
-        
-        for bill_doc in bills:
-            bill_count += 1
-            bill_data = bill_doc.to_dict()
-            bill_id = bill_doc.id
-            
-            print(f"Found bill {bill_count}: {bill_id}")
-            print(f"Bill data keys: {list(bill_data.keys())}")
-            
-            # Use latest action date if available, otherwise use regular date
-            latest_action_date = bill_data.get('latest action date') or bill_data.get('date', 'N/A')
-            
-            top_bills.append({
-                'id': bill_id,
-                'title': bill_data.get('title', 'No title available'),
-                'description': bill_data.get('summary', 'No description available'),
-                'update_date': latest_action_date,
-                'affected_populations_summary': bill_data.get('demographics', ''),
-                'categorized_populations': bill_data.get('demographics', ''),
-                'population_affect_summary': bill_data.get('population affect summary', 'No population analysis available'),
-                'bill_number': bill_id,
-                'xml link': bill_data.get('xml link', '')
-            })
-        
-        print(f"Total bills found: {bill_count}")
-        return top_bills
-        
-    except Exception as e:
-        print(f"Error getting top bills from Firestore: {str(e)}")
-        return []
+    matching_bills = []
+    # Later batches continue from the last scanned snapshot, so only a
+    # client cursor needs an extra lookup
+    with profile_phase('firestore'):
+        last_scanned = _cursor_snapshot(after_id)
+    scanned = 0
+
+    while len(matching_bills) < limit and scanned < MAX_SCAN_PER_PAGE:
+        with profile_phase('firestore'):
+            batch = list(_ordered_bills_query(last_scanned).limit(SCAN_BATCH_SIZE).stream())
+        if not batch:
+            # Reached the end of the collection
+            return matching_bills, None
+
+        with profile_phase('matching'):
+            for bill_doc in batch:
+                scanned += 1
+                last_scanned = bill_doc
+                bill_data = bill_doc.to_dict()
+
+                if bill_matches_demographics(bill_data, demographics):
+                    matching_bills.append(serialize_bill(bill_doc.id, bill_data, fields))
+                    if len(matching_bills) >= limit:
+                        break
+
+        if len(batch) < SCAN_BATCH_SIZE and last_scanned is batch[-1]:
+            # Short batch fully consumed means there is nothing left to scan
+            return matching_bills, None
+
+    return matching_bills, encode_cursor(last_scanned.id)
+
+
+def get_top_10_bills(limit=DEFAULT_PAGE_SIZE, after_id=None, fields=None):
+    """
+    Get the most recent bills from Firestore (by date), one page at a time.
+    Returns (bills, next_cursor); next_cursor is None on the last page.
+    """
+    # Fetch one extra document to know whether another page exists
+    with profile_phase('firestore'):
+        bill_docs = list(_ordered_bills_query(_cursor_snapshot(after_id)).limit(limit + 1).stream())
+    has_more = len(bill_docs) > limit
+    bill_docs = bill_docs[:limit]
+
+    with profile_phase('serialize'):
+        top_bills = [serialize_bill(bill_doc.id, bill_doc.to_dict(), fields) for bill_doc in bill_docs]
+    next_cursor = encode_cursor(bill_docs[-1].id) if has_more else None
+    return top_bills, next_cursor
 
 # Fetch recent bills from the U.S. Congress API
 def fetch_recent_bills():
@@ -286,42 +347,46 @@ Provide a concise summary of which populations are primarily affected and how. D
     )
     return response.choices[0].message.content
 
-# Categorize populations into specified brackets
-def categorize_population(population_analysis):
+# Options the LLM may pick from for each demographic field
+CATEGORY_OPTIONS = {
+    'age_groups': ('Age', '0-18, 19-25, 25-40, 41-65, 65+'),
+    'income_brackets': ('Income', '$0-11,600, $11,601-47,150, $47,151-100,525, $100,526+'),
+    'race_or_ethnicity': ('Race', 'Hispanic or Latino, White (not Hispanic or Latino), Black or African American, Asian, American Indian or Alaska Native, Native Hawaiian or Other Pacific Islander'),
+    'location': ('Location', ', '.join(STATES)),
+    'gender': ('Gender', 'Male, Female, Other'),
+    # Only asked for when the bill mentions these groups
+    'other_groups': ('Other groups', 'Veterans, Students')
+}
+
+def categorize_with_llm(population_analysis, fields, hints=None):
     """
     Convert Groq AI free-text population analysis into structured categories
-    using the specified options.
+    for the given fields only, using the specified options. hints are
+    keyword matches from the bill text ({field: {value: term}}) for the
+    model to weigh.
     """
+    options = "\n\n".join(f"{CATEGORY_OPTIONS[field][0]}:\n{CATEGORY_OPTIONS[field][1]}" for field in fields)
+    template = ",\n".join(f'    "{field}": []' for field in fields)
+    hint_lines = [
+        f"- {CATEGORY_OPTIONS[field][0]}: " + ', '.join(f'{value} (mentions "{term}")' for value, term in hints[field].items())
+        for field in fields if hints and hints.get(field)
+    ]
+    hint_text = ""
+    if hint_lines:
+        hint_text = "\nThe bill text mentions these terms. Only use a value if the bill actually affects that group:\n" + "\n".join(hint_lines) + "\n"
     prompt = f"""
 Based on this population analysis, extract and categorize the affected groups 
 into ONLY the following options:
 
-Age:
-0-18, 19-25, 25-40, 41-65, 65+
-
-Income:
-$0-11,600, $11,601-47,150, $47,151-100,525, $100,526+
-
-Race:
-Hispanic or Latino, White (not Hispanic or Latino), Black or African American, Asian, American Indian or Alaska Native, Native Hawaiian or Other Pacific Islander
-
-Location:
-Alabama, Alaska, Arizona, Arkansas, California, Colorado, Connecticut, Delaware, Florida, Georgia, Hawaii, Idaho, Illinois, Indiana, Iowa, Kansas, Kentucky, Louisiana, Maine, Maryland, Massachusetts, Michigan, Minnesota, Mississippi, Missouri, Montana, Nebraska, Nevada, New Hampshire, New Jersey, New Mexico, New York, North Carolina, North Dakota, Ohio, Oklahoma, Oregon, Pennsylvania, Rhode Island, South Carolina, South Dakota, Tennessee, Texas, Utah, Vermont, Virginia, Washington, West Virginia, Wisconsin, Wyoming
-
-Gender:
-Male, Female, Other
+{options}
 
 Population Analysis:
 {population_analysis}
-
+{hint_text}
 Return ONLY a JSON object like this (use empty arrays if none apply) Have NO text outside of the json:
 
 {{
-    "age_groups": [],
-    "income_brackets": [],
-    "race_or_ethnicity": [],
-    "location": [],
-    "gender": []
+{template}
 }}
 """
     response = groq_client.chat.completions.create(
@@ -330,6 +395,40 @@ Return ONLY a JSON object like this (use empty arrays if none apply) Have NO tex
     )
     return response.choices[0].message.content
 
+# Categorize populations into specified brackets
+def categorize_population(population_analysis, title='', summary='', description='', bill_id=None, bill_text=''):
+    """
+    Categorize the affected populations. Values the bill states explicitly
+    in its title, summaries or text (state names used as places, numeric age
+    and income limits) are filled in by demographic_rules without the LLM;
+    the LLM only gets the fields the rules couldn't resolve, with keyword
+    matches from the title and summaries as hints. For a sample of bills the
+    LLM also categorizes every field so agreement with the rules can be
+    measured.
+    Returns a JSON string, like the LLM's raw output, for add_bill.
+    """
+    rule_fields = extract_demographics(title, summary, description, bill_text)
+    # Keywords in the legal text are too noisy even as hints ("children" in
+    # a definitions section), so only the title and summaries are used
+    hints = keyword_hints(title, summary, description)
+    unresolved = [field for field in CATEGORY_FIELDS if field not in rule_fields]
+
+    shadow = bill_id is not None and random.random() < Config.RULES_SHADOW_RATE
+    llm_fields = {}
+    fields_for_llm = list(CATEGORY_FIELDS if shadow else unresolved)
+    if hints.get('other_groups'):
+        fields_for_llm.append('other_groups')
+    if fields_for_llm:
+        llm_fields = parse_demographics(categorize_with_llm(population_analysis, fields_for_llm, hints)) or {}
+    if shadow:
+        record_agreement(bill_id, rule_fields, llm_fields)
+
+    categorized = {field: rule_fields.get(field) or llm_fields.get(field, []) for field in CATEGORY_FIELDS}
+    other_groups = [group for group in llm_fields.get('other_groups') or [] if group in hints.get('other_groups', {})]
+    if other_groups:
+        categorized['other_groups'] = other_groups
+    return json.dumps(categorized)
+
 
 
 @app.route('/api/analyze_bills', methods=['GET'])
@@ -351,7 +450,7 @@ def analyze_bills():
             # Analyze populations
             affected_populations = analyze_bill_population(title, description)
             
-            categorized_populations = categorize_population(affected_populations)
+            categorized_populations = categorize_population(affected_populations, title, '', description)
             
             analyzed_bills.append({
                 'bill_number': bill.get('number', 'N/A'),
@@ -375,7 +474,9 @@ def analyze_bills():
 def get_data():
     """
     Endpoint that frontend expects for bill data.
-    Queries Firestore based on demographics or returns top 10 bills.
+    Queries Firestore based on demographics or returns the most recent bills.
+    Supports ?fields= projection, ?limit= page size and an opaque ?cursor=
+    taken from next_cursor of the previous page.
     """
     try:
         # Get demographics from query parameters
@@ -389,27 +490,61 @@ def get_data():
                 import urllib.parse
                 decoded_value = urllib.parse.unquote(value)
                 demographics[field] = [v.strip() for v in decoded_value.split(',') if v.strip()]
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            cursor = request.args.get('cursor')
+            after_id = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
         
         # Check if any demographics are provided
         has_demographics = any(demographics.values())
         
-        if has_demographics:
-            # Query bills that match demographics
-            bills = query_bills_by_demographics(demographics)
-        else:
-            # Get top 10 bills if no demographics
-            bills = get_top_10_bills()
+        try:
+            if has_demographics:
+                # Query bills that match demographics
+                bills, next_cursor = query_bills_by_demographics(demographics, limit, after_id, fields)
+            else:
+                # Most recent bills if no demographics
+                bills, next_cursor = get_top_10_bills(limit, after_id, fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "success": True,
             "data": bills,
             "count": len(bills),
-            "filtered_by_demographics": has_demographics
+            "filtered_by_demographics": has_demographics,
+            "next_cursor": next_cursor
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/data/<bill_id>', methods=['GET'])
+def get_bill(bill_id):
+    """Fetch a single bill's details, so list pages can request only light fields"""
+    try:
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        with profile_phase('firestore'):
+            bill_doc = db.collection('bills').document(bill_id).get()
+        if not bill_doc.exists:
+            return jsonify({"error": "Bill not found"}), 404
+
+        return jsonify({
+            "success": True,
+            "data": serialize_bill(bill_doc.id, bill_doc.to_dict(), fields)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # @app.route('/api/demographics', methods=['POST'])
 # def submit_demographics():
 #     """Endpoint for submitting demographic data"""
@@ -472,22 +607,7 @@ def debug_demographics():
             }
             
             # Try to parse demographics
-            bill_demographics = None
-            if categorized_data:
-                if isinstance(categorized_data, str):
-                    try:
-                        import json
-                        bill_demographics = json.loads(categorized_data)
-                    except json.JSONDecodeError:
-                        import re
-                        json_match = re.search(r'\{.*\}', categorized_data, re.DOTALL)
-                        if json_match:
-                            try:
-                                bill_demographics = json.loads(json_match.group())
-                            except json.JSONDecodeError:
-                                pass
-                elif isinstance(categorized_data, dict):
-                    bill_demographics = categorized_data
+            bill_demographics = parse_bill_demographics(categorized_data)
             
             result["parsed_demographics"] = bill_demographics
             
@@ -518,7 +638,41 @@ def parse_demographics(raw_text):
         print("Error parsing demographics JSON:", e)
         return None
 
-def add_bill(bill_id, title,original, summary,raw_text, affected_population_summary, latest_action_date, bill_xml):
+def build_bill_explainer(bill_id, title, summary, bill_xml):
+    """
+    Return the plain-language explainer for a bill's current text version.
+    The new version is diffed section by section against the last one we
+    saw: an unchanged text reuses the stored explainer, and a changed text
+    only sends the changed sections to the LLM.
+    """
+    existing_explainer = None
+    existing = db.collection("bills").document(bill_id).get()
+    if existing.exists:
+        existing_data = existing.to_dict()
+        existing_explainer = existing_data.get('explainer')
+        if existing_explainer and existing_data.get('explainer version') == bill_xml:
+            return existing_explainer
+
+    try:
+        version = record_version(bill_id, bill_xml)
+        if existing_explainer and version and version['previous version']:
+            diff = version['diff']
+            print(f"Bill {bill_id}: {describe_changes(diff)} ({diff['unchanged']} sections unchanged)")
+            if not diff['changed_keys'] and not diff['removed']:
+                return existing_explainer
+            changed_keys = set(diff['changed_keys'])
+            # Text without sections can't be updated piecewise, so explain it from scratch
+            if WHOLE_DOCUMENT_KEY not in changed_keys:
+                changed = [s for s in version['sections'] if s['key'] in changed_keys]
+                return update_bill_explainer(bill_id, title, existing_explainer, changed, diff['removed'])
+        # Reuse the XML record_version already downloaded
+        xml_bytes = version['xml'] if version else None
+        return generate_bill_explainer(bill_id, title, summary, bill_xml, xml_bytes)
+    except Exception as e:
+        print(f"Error generating explainer for bill {bill_id}: {e}")
+        return None
+
+def add_bill(bill_id, title,original, summary,raw_text, affected_population_summary, latest_action_date, bill_xml, explainer=None):
     bill_ref = db.collection("bills").document(bill_id)
     print(raw_text)
     demographics = parse_demographics(raw_text)
@@ -533,11 +687,76 @@ def add_bill(bill_id, title,original, summary,raw_text, affected_population_summ
             "demographics": demographics, 
             "population affect summary": affected_population_summary, 
             "latest action date":latest_action_date, 
-            "xml link": bill_xml
+            "xml link": bill_xml,
+            "explainer": explainer,
+            "explainer version": bill_xml if explainer else None
         })
+        # Cached chat answers about an older text version are stale now
+        invalidate_bill(bill_id, bill_xml)
+        # Keep the local full text search index in sync
+        index_bill(bill_id, title, original, summary, affected_population_summary, demographics, latest_action_date, bill_xml)
         print(f"✅ Added bill: {title}")
 
 
+def ingest_bill(bill_number, title, description, summary_text, latest_action_date, bill_xml, bill_id=None):
+    """
+    Run the LLM analysis for one bill and store it with add_bill.
+    Shared by the Congress API refresh and the bulk archive importer.
+    Callers pass the <congress>-<type>-<number> document id from
+    bulk_import.bill_document_id; it defaults to the bare bill number.
+    """
+    bill_id = bill_id or bill_number
+    if summary_text is None:
+        # add_bill only stores bills with a summary, so skip the LLM calls
+        print(f"Skipping bill {bill_id}: no summary available")
+        return
+
+    # print("\n2. Analyzing affected populations with Groq AI...")
+    affected_populations = analyze_bill_population(title, description)
+    # print(f"\nAffected Populations Analysis:")
+    print(affected_populations)
+    
+    # Precompute the "explain this bill" answer for the chatbot
+    explainer = build_bill_explainer(bill_id, title, description, bill_xml)
+
+    # print("\n3. Categorizing populations...")
+    # Usually already scraped for the explainer; the first 8000 characters
+    # cover the findings and eligibility sections the rules look for
+    bill_text = scrape_xml_content(bill_xml) if bill_xml else None
+    categorized = categorize_population(affected_populations, title, summary_text, description, bill_id, bill_text)
+
+    add_bill(bill_id, title, summary_text, description, categorized, affected_populations, latest_action_date, bill_xml, explainer)
+
+
+def ingest_congress_bill(bill):
+    """Fetch the summary and text link for a bill from the Congress API bill list and ingest it"""
+    title = bill.get('title', 'No title available')
+    latest_action = bill.get('latestAction', {})
+    description = latest_action.get('text', 'No description available')
+
+    summary_text = get_bill_summary(
+        congress=bill.get('congress'),
+        bill_type=bill.get('type'),
+        bill_number=bill.get('number')
+    )
+
+    bill_xml = get_bill_xml(
+        congress=bill.get('congress'),
+        bill_type=bill.get('type'),
+        bill_number=bill.get('number')
+    )
+    # print(summary_text)
+    latest_action_date = bill.get("latestAction").get("actionDate")
+    
+    print(f"\nBill Number: {bill.get('number', 'N/A')}")
+    # print(f"Title: {title}")
+    # print(f"Latest Action: {description}")
+    # print(f"Update Date: {bill.get('updateDate', 'N/A')}")
+    
+    ingest_bill(bill.get('number'), title, description, summary_text, latest_action_date, bill_xml,
+                bill_document_id(bill))
+
+
 # Test function to demonstrate functionality
 def test_analyze_bills():
     """Test the bill analysis without running the Flask server"""
@@ -562,40 +781,7 @@ def test_analyze_bills():
             print(f"{'-' * 80}")
             # print(bill)
             
-            title = bill.get('title', 'No title available')
-            latest_action = bill.get('latestAction', {})
-            description = latest_action.get('text', 'No description available')
-
-            summary_text = get_bill_summary(
-                congress=bill.get('congress'),
-                bill_type=bill.get('type'),
-                bill_number=bill.get('number')
-            )
-
-            bill_xml = get_bill_xml(
-                congress=bill.get('congress'),
-                bill_type=bill.get('type'),
-                bill_number=bill.get('number')
-            )
-            # print(summary_text)
-            latest_action_date = bill.get("latestAction").get("actionDate")
-            
-            print(f"\nBill Number: {bill.get('number', 'N/A')}")
-            # print(f"Title: {title}")
-            # print(f"Latest Action: {description}")
-            # print(f"Update Date: {bill.get('updateDate', 'N/A')}")
-            
-            # print("\n2. Analyzing affected populations with Groq AI...")
-            affected_populations = analyze_bill_population(title, description)
-            # print(f"\nAffected Populations Analysis:")
-            print(affected_populations)
-            
-            # print("\n3. Categorizing populations...")
-            categorized = categorize_population(affected_populations)
-            # print(f"\nCategorized Populations:")
-            # print(categorized)
-            # print()
-            add_bill(bill.get('number'),title,summary_text, description, categorized, affected_populations, latest_action_date, bill_xml)
+            ingest_congress_bill(bill)
     
     except Exception as e:
         print(f"\n Error: {str(e)}")
@@ -603,7 +789,8 @@ def test_analyze_bills():
         traceback.print_exc()
 
 if __name__ == '__main__':
-    # Uncomment to test without running server
+    # Uncomment to test without running server. To refresh data in the
+    # background use ingest_worker.py instead.
     # test_analyze_bills()
     
     # Run Flask server
@@ -0,0 +1,237 @@
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import requests
+from flask import Blueprint, jsonify
+
+versions_bp = Blueprint('versions', __name__)
+
+VERSIONS_COLLECTION = 'bill_versions'
+# How many past versions to keep per bill
+MAX_HISTORY = 20
+# Section hashes live in a "sections" subcollection, this many per document,
+# so omnibus bills with thousands of sections stay under Firestore's 1 MiB limit
+SECTIONS_PER_DOC = 500
+MAX_STORED_HEADER = 200
+# History entries keep counts plus this many example headers per change type
+MAX_HISTORY_HEADERS = 10
+# Key of the single pseudo-section used for text without <section> elements
+WHOLE_DOCUMENT_KEY = 'full text'
+
+# This will be set when the app starts
+_db = None
+
+
+def init_bill_versions(db_instance):
+    """Initialize the database instance for version tracking"""
+    global _db
+    _db = db_instance
+
+
+def _clean(text):
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+def split_sections(xml_bytes):
+    """
+    Split bill XML into its sections, in document order.
+    Returns a list of {"key", "header", "text", "hash"} dicts. Sections are
+    keyed by their header rather than their number so inserting a section
+    doesn't make every later one look changed. Text with no sections at all
+    (resolutions, <text>-only bodies) is hashed as one WHOLE_DOCUMENT_KEY entry.
+    """
+    root = ET.fromstring(xml_bytes)
+    sections = []
+    seen_keys = {}
+
+    def top_level_sections(element):
+        # Sections quoted inside another section (amendments to existing law)
+        # belong to the outer section
+        for child in element:
+            if child.tag == 'section':
+                yield child
+            else:
+                yield from top_level_sections(child)
+
+    for section in top_level_sections(root):
+        enum = _clean(section.findtext('enum'))
+        header = _clean(section.findtext('header'))
+        text = _clean(' '.join(section.itertext()))
+        if not text:
+            continue
+
+        base_key = (header.lower() or enum or f"section-{len(sections) + 1}")[:MAX_STORED_HEADER]
+        # Repeated headers (common in omnibus bills) get a running suffix
+        seen_keys[base_key] = seen_keys.get(base_key, 0) + 1
+        key = base_key if seen_keys[base_key] == 1 else f"{base_key} #{seen_keys[base_key]}"
+
+        # The section number is left out of the hash so renumbering alone isn't a change
+        body = text[len(enum):].strip() if enum and text.startswith(enum) else text
+        sections.append({
+            'key': key,
+            'header': f"{enum} {header}".strip() or key,
+            'text': text,
+            'hash': hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+        })
+
+    if not sections:
+        text = _clean(' '.join(root.itertext()))
+        if text:
+            sections.append({
+                'key': WHOLE_DOCUMENT_KEY,
+                'header': 'Full text',
+                'text': text,
+                'hash': hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+            })
+    return sections
+
+
+def fetch_sections(xml_url):
+    """
+    Download a text version and split it into sections. Returns
+    (sections, xml_bytes), or (None, None) on failure.
+    """
+    try:
+        response = requests.get(xml_url)
+        response.raise_for_status()
+        return split_sections(response.content), response.content
+    except (requests.RequestException, ET.ParseError) as e:
+        print(f"Error fetching bill sections from {xml_url}: {e}")
+        return None, None
+
+
+def diff_sections(previous, current):
+    """
+    Compare stored section hashes ({key: {"hash", "header"}}) with freshly
+    split sections. Returns lists of added, removed and modified headers plus
+    the keys that need reprocessing.
+    """
+    current_by_key = {s['key']: s for s in current}
+    added = [s['header'] for s in current if s['key'] not in previous]
+    modified = [s['header'] for s in current
+                if s['key'] in previous and previous[s['key']].get('hash') != s['hash']]
+    removed = [entry.get('header', key) for key, entry in previous.items() if key not in current_by_key]
+    changed_keys = [s['key'] for s in current
+                    if s['key'] not in previous or previous[s['key']].get('hash') != s['hash']]
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'changed_keys': changed_keys,
+        'unchanged': len(current) - len(changed_keys)
+    }
+
+
+def describe_changes(diff):
+    """One-line plain summary of a section diff"""
+    if not (diff['added'] or diff['removed'] or diff['modified']):
+        return "No changes to the bill text."
+    parts = []
+    for label, headers in (('Added', diff['added']), ('Changed', diff['modified']), ('Removed', diff['removed'])):
+        if headers:
+            shown = '; '.join(headers[:5])
+            more = f" and {len(headers) - 5} more" if len(headers) > 5 else ''
+            parts.append(f"{label} {len(headers)} section{'s' if len(headers) != 1 else ''}: {shown}{more}.")
+    return ' '.join(parts)
+
+
+def _load_section_hashes(version_ref, stored_data):
+    """Stored {key: {"hash", "header"}} for the current version"""
+    if 'sections' in stored_data:
+        # Written before section hashes moved to the subcollection
+        return stored_data['sections']
+    sections = {}
+    for chunk in range(stored_data.get('section chunks', 0)):
+        chunk_doc = version_ref.collection('sections').document(str(chunk)).get()
+        if chunk_doc.exists:
+            for entry in chunk_doc.to_dict().get('sections', []):
+                sections[entry['key']] = {'hash': entry['hash'], 'header': entry['header']}
+    return sections
+
+
+def _history_headers(headers):
+    return {'count': len(headers), 'sample': headers[:MAX_HISTORY_HEADERS]}
+
+
+def record_version(bill_id, xml_url):
+    """
+    Split the bill's current text version into sections, diff it against the
+    stored version and save the new section hashes. Returns a dict with the
+    diff, the new sections, the downloaded XML and the previous version URL
+    (None for a bill we haven't seen), or None if the text couldn't be fetched.
+    """
+    if _db is None or not xml_url:
+        return None
+
+    version_ref = _db.collection(VERSIONS_COLLECTION).document(str(bill_id))
+    stored = version_ref.get()
+    stored_data = stored.to_dict() if stored.exists else {}
+    previous_url = stored_data.get('current version')
+
+    sections, xml_bytes = fetch_sections(xml_url)
+    if sections is None:
+        return None
+
+    previous_sections = _load_section_hashes(version_ref, stored_data) if previous_url else {}
+    diff = diff_sections(previous_sections, sections)
+
+    if previous_url != xml_url:
+        history = stored_data.get('history', [])
+        history.insert(0, {
+            'version': xml_url,
+            'previous version': previous_url,
+            'recorded_at': datetime.now(),
+            'added': _history_headers(diff['added']),
+            'removed': _history_headers(diff['removed']),
+            'modified': _history_headers(diff['modified']),
+            'summary': describe_changes(diff) if previous_url else "First version recorded."
+        })
+
+        entries = [{'key': s['key'], 'hash': s['hash'], 'header': s['header'][:MAX_STORED_HEADER]}
+                   for s in sections]
+        chunks = [entries[i:i + SECTIONS_PER_DOC] for i in range(0, len(entries), SECTIONS_PER_DOC)]
+        # One batch so the hashes and the version they belong to change together
+        batch = _db.batch()
+        for number, chunk in enumerate(chunks):
+            batch.set(version_ref.collection('sections').document(str(number)), {'sections': chunk})
+        for number in range(len(chunks), stored_data.get('section chunks', 0)):
+            batch.delete(version_ref.collection('sections').document(str(number)))
+        batch.set(version_ref, {
+            'current version': xml_url,
+            'section count': len(sections),
+            'section chunks': len(chunks),
+            'history': history[:MAX_HISTORY],
+            'updated_at': datetime.now()
+        })
+        batch.commit()
+
+    return {
+        'previous version': previous_url,
+        'diff': diff,
+        'sections': sections,
+        'xml': xml_bytes
+    }
+
+
+@versions_bp.route('/api/data/<bill_id>/changes', methods=['GET'])
+def get_bill_changes(bill_id):
+    """What changed between the text versions of a bill, newest first"""
+    try:
+        if _db is None:
+            return jsonify({"error": "Database not initialized"}), 500
+
+        version_doc = _db.collection(VERSIONS_COLLECTION).document(bill_id).get()
+        if not version_doc.exists:
+            return jsonify({"error": "No text versions recorded for this bill"}), 404
+
+        version_data = version_doc.to_dict()
+        return jsonify({
+            "success": True,
+            "current_version": version_data.get('current version'),
+            "section_count": version_data.get('section count', len(version_data.get('sections', {}))),
+            "changes": version_data.get('history', [])
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
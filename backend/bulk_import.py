@@ -0,0 +1,220 @@
+"""
+Bulk ingestion from local govinfo BILLSTATUS archives.
+
+Reads BILLSTATUS ZIP files (or directories / single XML files) downloaded from
+https://www.govinfo.gov/bulkdata/BILLSTATUS, parses them across a process pool
+and stores each bill with the same document shape as the Congress API refresh.
+No Congress API calls are made.
+
+Usage:
+    python bulk_import.py BILLSTATUS-119-hr.zip BILLSTATUS-119-s.zip --workers 8
+    python bulk_import.py BILLSTATUS-119-hr.zip --enqueue
+"""
+import argparse
+import os
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Max parse jobs queued per worker, so a large archive is never fully in memory
+IN_FLIGHT_PER_WORKER = 4
+
+
+def _text(element, path):
+    """Stripped text at path under element, or None"""
+    found = element.find(path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip() or None
+
+
+def _latest_summary(bill):
+    """Text of the most recent CRS summary (newer and older BILLSTATUS layouts)"""
+    summaries = bill.findall('summaries/summary') or bill.findall('summaries/billSummaries/item')
+    if not summaries:
+        return None
+    latest = max(summaries, key=lambda s: _text(s, 'updateDate') or _text(s, 'actionDate') or '')
+    return _text(latest, 'text')
+
+
+def _latest_text_xml(bill):
+    """XML link of the most recent text version, like get_bill_xml returns"""
+    versions = bill.findall('textVersions/item')
+    if not versions:
+        return None
+    # Undated versions (e.g. enrolled bills awaiting a date) sort last
+    latest = max(versions, key=lambda v: _text(v, 'date') or '')
+    for fmt in latest.findall('formats/item'):
+        url = _text(fmt, 'url')
+        if url and url.lower().endswith('.xml'):
+            return url
+    return None
+
+
+def parse_billstatus(xml_bytes):
+    """
+    Parse one BILLSTATUS XML document into the fields ingestion needs.
+    Returns None if the document isn't a bill status file.
+    """
+    root = ET.fromstring(xml_bytes)
+    bill = root.find('bill')
+    if bill is None:
+        return None
+
+    number = _text(bill, 'number') or _text(bill, 'billNumber')
+    if not number:
+        return None
+
+    return {
+        'congress': _text(bill, 'congress'),
+        'type': _text(bill, 'type') or _text(bill, 'billType'),
+        'number': number,
+        'title': _text(bill, 'title') or 'No title available',
+        'description': _text(bill, 'latestAction/text') or 'No description available',
+        'latest_action_date': _text(bill, 'latestAction/actionDate'),
+        'summary': _latest_summary(bill),
+        'xml_link': _latest_text_xml(bill)
+    }
+
+
+def bill_document_id(bill):
+    """
+    Firestore document id for a bill, from an archive bill or a Congress API
+    bill list entry (both have congress, type and number). Bill numbers repeat
+    across bill types and Congresses (HR 1, S 1, H.Res 1, ...), so all three
+    are part of the id. Also used as the ingestion job key.
+    """
+    return f"{bill['congress']}-{bill['type']}-{bill['number']}"
+
+
+def _parse_member(name, xml_bytes):
+    """Process pool entry point: parse one archive member, never raising"""
+    try:
+        return parse_billstatus(xml_bytes)
+    except Exception as e:
+        # A bad member (malformed XML, unexpected layout) must not abort the import
+        print(f"Skipping {name}: {e}")
+        return None
+
+
+def iter_xml_documents(paths):
+    """Yield (name, bytes) for every XML document in the given ZIPs, directories or files"""
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    full_path = os.path.join(dirpath, filename)
+                    if filename.lower().endswith('.zip'):
+                        yield from iter_xml_documents([full_path])
+                    elif filename.lower().endswith('.xml'):
+                        with open(full_path, 'rb') as f:
+                            yield full_path, f.read()
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith('.xml'):
+                        continue
+                    yield f"{path}:{info.filename}", archive.read(info)
+        else:
+            with open(path, 'rb') as f:
+                yield path, f.read()
+
+
+def parse_archives(paths, workers=None):
+    """Parse all BILLSTATUS documents in paths across a process pool, yielding bill dicts"""
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for name, xml_bytes in iter_xml_documents(paths):
+            pending.add(executor.submit(_parse_member, name, xml_bytes))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result():
+                        yield future.result()
+        for future in pending:
+            if future.result():
+                yield future.result()
+
+
+def _is_unchanged(db, bill):
+    """Whether the bill is already stored with the same text version"""
+    if not bill['xml_link']:
+        return False
+    existing = db.collection('bills').document(bill_document_id(bill)).get()
+    return existing.exists and existing.to_dict().get('xml link') == bill['xml_link']
+
+
+def import_archives(paths, workers=None, limit=None, skip_existing=False):
+    """Parse the archives and store every bill through the normal ingestion path"""
+    # Imported here so pool workers don't initialize Firebase/Groq clients
+    from app import db, ingest_bill
+
+    imported = 0
+    skipped = 0
+    for bill in parse_archives(paths, workers):
+        bill_id = bill_document_id(bill)
+        if skip_existing and _is_unchanged(db, bill):
+            skipped += 1
+            continue
+
+        print(f"\nBill {bill['type']} {bill['number']} ({bill['congress']}th Congress)")
+        try:
+            ingest_bill(bill['number'], bill['title'], bill['description'], bill['summary'],
+                        bill['latest_action_date'], bill['xml_link'], bill_id)
+            imported += 1
+        except Exception as e:
+            print(f"Error ingesting bill {bill_id}: {e}")
+
+        if limit and imported >= limit:
+            break
+
+    print(f"\nImported {imported} bills, skipped {skipped} unchanged bills")
+    return imported
+
+
+def enqueue_archives(paths, workers=None, limit=None, skip_existing=False):
+    """Parse the archives and queue each bill for the ingestion workers"""
+    from ingest_worker import enqueue_parsed_bill
+
+    db = None
+    if skip_existing:
+        from app import db
+
+    queued = 0
+    skipped = 0
+    for bill in parse_archives(paths, workers):
+        # Queueing a finished job runs it again, so check before queueing
+        if skip_existing and _is_unchanged(db, bill):
+            skipped += 1
+            continue
+        enqueue_parsed_bill(bill)
+        queued += 1
+        if limit and queued >= limit:
+            break
+    print(f"Queued {queued} bills, skipped {skipped} unchanged bills")
+    return queued
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import bills from local govinfo BILLSTATUS archives")
+    parser.add_argument('paths', nargs='+', help="BILLSTATUS ZIP files, directories or XML files")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--limit', type=int, default=None, help="Stop after importing (or queueing) this many bills")
+    parser.add_argument('--skip-existing', action='store_true',
+                        help="Skip bills already stored with the same text version")
+    parser.add_argument('--enqueue', action='store_true',
+                        help="Queue bills for ingest_worker.py instead of ingesting them here")
+    args = parser.parse_args(argv)
+
+    if args.enqueue:
+        enqueue_archives(args.paths, args.workers, args.limit, args.skip_existing)
+    else:
+        import_archives(args.paths, args.workers, args.limit, args.skip_existing)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,20 @@
 from flask import Blueprint, jsonify, request
+from firebase_admin import auth as firebase_auth
+from firebase_admin.exceptions import FirebaseError
 from groq import Groq
 import os
 from dotenv import load_dotenv
 import requests
 import xml.etree.ElementTree as ET
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+from answer_cache import get_cached_answer, is_explain_question, profile_key, store_answer
+from profiling import profile_phase
+from admission import AdmissionRejected, chat_admission, estimate_prompt_tokens
+
 chatbot_bp = Blueprint('chatbot', __name__)
 
 # This will be set when the blueprint is registered
@@ -24,14 +32,43 @@ groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 # Note: get_bill_xml_url() removed - we now use the stored XML link directly from Firestore
     
-def scrape_xml_content(xml_url):
-    """Scrape and clean XML content from the bill XML URL"""
+# Each text version has its own XML URL and never changes, so scraped text
+# can be reused across chat requests
+_scraped_text = OrderedDict()
+_scraped_lock = threading.Lock()
+MAX_SCRAPED_VERSIONS = 128
+
+
+def scrape_xml_content(xml_url, xml_bytes=None):
+    """
+    Scrape and clean XML content from the bill XML URL. Pass xml_bytes when
+    the document was already downloaded to skip fetching it again.
+    """
+    with _scraped_lock:
+        if xml_url in _scraped_text:
+            _scraped_text.move_to_end(xml_url)
+            return _scraped_text[xml_url]
+
+    full_text = _scrape_xml_content(xml_url, xml_bytes)
+    if full_text is not None:
+        with _scraped_lock:
+            _scraped_text[xml_url] = full_text
+            while len(_scraped_text) > MAX_SCRAPED_VERSIONS:
+                _scraped_text.popitem(last=False)
+    return full_text
+
+
+def _scrape_xml_content(xml_url, xml_bytes=None):
     try:
-        response = requests.get(xml_url)
-        response.raise_for_status()
+        if xml_bytes is None:
+            with profile_phase('xml_fetch'):
+                response = requests.get(xml_url)
+                response.raise_for_status()
+            xml_bytes = response.content
         
         # Parse XML
-        root = ET.fromstring(response.content)
+        with profile_phase('xml_parse'):
+            root = ET.fromstring(xml_bytes)
         
         # Extract text content, focusing on main sections
         text_content = []
@@ -73,56 +110,10 @@ def scrape_xml_content(xml_url):
 
 # Note: extract_bill_info_from_id() removed - we now use the stored XML link directly
 
-@chatbot_bp.route('/api/chatbot/message', methods=['POST'])
-def send_message():
-    """Handle chatbot message endpoint"""
-    try:
-        data = request.json
-        user_message = data.get('message', '')
-        
-        # Get context (bills data, demographics, etc.)
-        context = data.get('context', {})
-        
-        # Build context string for the prompt
-        context_str = ""
-        
-        # Add demographic context
-        demographics = context.get('demographics', {})
-        if demographics:
-            context_str += f"\nUser Demographics: {demographics}\n"
-        
-        # Add context cards (selected bills) with XML content
-        context_cards = context.get('contextCards', [])
-        if context_cards:
-            context_str += "\nRelevant Bills Context:\n"
-            for card in context_cards:
-                bill_id = card.get('id', '')
-                title = card.get('title', '')
-                description = card.get('description', '')
-                
-                # Try to get XML content from the stored XML link
-                xml_content = None
-                xml_link = card.get('xml link', '')
-                
-                if xml_link:
-                    # Use the stored XML link from Firestore
-                    xml_content = scrape_xml_content(xml_link)
-                    if xml_content is None:
-                        print(f"Failed to scrape XML content for bill {bill_id} from {xml_link}")
-                else:
-                    print(f"No XML link found for bill {bill_id}")
-                
-                # Use XML content if available, otherwise fall back to description
-                if xml_content:
-                    context_str += f"\n--- {title} ---\n"
-                    context_str += f"Bill ID: {bill_id}\n"
-                    context_str += f"Full Bill Text:\n{xml_content}\n"
-                else:
-                    # Fallback to original behavior
-                    context_str += f"- {title}: {description}\n"
-        
-        # Create the full prompt with context
-        system_message = f"""You are Bill Finder Assistant, a friendly and helpful guide for people who have no background in government or politics. Your goal is to make complex government bills and legislation accessible to everyday people.
+# Guidelines shared by live chat answers and the precomputed bill explainers
+def build_system_message(context_str):
+    """Build the Bill Finder Assistant system prompt around the given context"""
+    return f"""You are Bill Finder Assistant, a friendly and helpful guide for people who have no background in government or politics. Your goal is to make complex government bills and legislation accessible to everyday people.
 
 IMPORTANT GUIDELINES:
 - Use simple, everyday language. Avoid government jargon and legal terms.
@@ -145,38 +136,260 @@ When explaining bills:
 
 Remember: The user doesn't know what "appropriations" means. They don't understand "committee hearings" or "floor votes". Explain things as if talking to a smart friend who knows nothing about government."""
 
-        user_prompt = f"{user_message}"
-        
-        # Get chat history if provided
-        chat_history = data.get('chatHistory', [])
-        
-        # Build message history
-        messages = [
-            {"role": "system", "content": system_message}
+
+def build_bill_context(bill_id, title, description, xml_content):
+    """Context block for a single bill, using the full text when we have it"""
+    if xml_content:
+        return f"\n--- {title} ---\nBill ID: {bill_id}\nFull Bill Text:\n{xml_content}\n"
+    # Fallback to original behavior
+    return f"- {title}: {description}\n"
+
+
+def generate_bill_explainer(bill_id, title, description, xml_link, xml_bytes=None):
+    """
+    Precompute the plain-language answer to "explain this bill" so the chat
+    endpoint can serve it without an LLM call. Run at ingestion time.
+    """
+    xml_content = scrape_xml_content(xml_link, xml_bytes) if xml_link else None
+    context_str = "\nRelevant Bills Context:\n" + build_bill_context(bill_id, title, description, xml_content)
+
+    response = groq_client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[
+            {"role": "system", "content": build_system_message(context_str)},
+            {"role": "user", "content": "Can you explain this bill to me?"}
         ]
-        
-        # Add chat history (excluding system messages)
-        for msg in chat_history:
-            if msg.get('sender') == 'user':
-                messages.append({"role": "user", "content": msg.get('text', '')})
-            elif msg.get('sender') == 'bot':
-                messages.append({"role": "assistant", "content": msg.get('text', '')})
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_prompt})
-        
-        # Generate response using Groq
+    )
+    return response.choices[0].message.content
+
+
+def update_bill_explainer(bill_id, title, previous_explainer, changed_sections, removed_headers):
+    """
+    Revise an existing explainer for a new text version using only the
+    sections that changed, instead of re-sending the whole bill.
+    """
+    changed_text = ''
+    for section in changed_sections:
+        changed_text += f"\n[{section['header']}]\n{section['text']}\n"
+    # Same limit as scrape_xml_content to avoid token limits
+    if len(changed_text) > 8000:
+        changed_text = changed_text[:8000] + "... [Content truncated]"
+
+    context_str = f"\nRelevant Bills Context:\n--- {title} ---\nBill ID: {bill_id}\n"
+    context_str += f"\nCurrent explanation of this bill:\n{previous_explainer}\n"
+    if changed_text:
+        context_str += f"\nNew or changed sections in the latest version:\n{changed_text}\n"
+    if removed_headers:
+        context_str += f"\nSections removed in the latest version: {'; '.join(removed_headers)}\n"
+
+    response = groq_client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[
+            {"role": "system", "content": build_system_message(context_str)},
+            {"role": "user", "content": "This bill was updated. Rewrite the explanation of this bill so it reflects the changes, keeping everything that still applies. Reply with only the new explanation."}
+        ]
+    )
+    return response.choices[0].message.content
+
+
+def get_bill_explainer(bill_id, version):
+    """Return the stored explainer for a bill if it was built from this text version"""
+    if _db is None or not bill_id:
+        return None
+    try:
+        bill_doc = _db.collection('bills').document(bill_id).get()
+    except Exception as e:
+        print(f"Error loading explainer for bill {bill_id}: {e}")
+        return None
+    if not bill_doc.exists:
+        return None
+    bill_data = bill_doc.to_dict()
+    if bill_data.get('explainer') and bill_data.get('explainer version') == version:
+        return bill_data['explainer']
+    return None
+
+
+def is_first_question(chat_history):
+    """Whether the user hasn't asked anything yet (the history may hold the bot greeting)"""
+    return not any(msg.get('sender') == 'user' for msg in chat_history)
+
+
+def get_instant_answer(user_message, chat_history, context_cards, demographics):
+    """
+    Answer without calling the LLM when possible: the precomputed explainer
+    for "explain this bill" questions, or a cached answer to the same
+    question about the same bill text version from a user with the same
+    demographics. Only applies to the first question about a
+    single bill, since later turns depend on the conversation so far.
+    """
+    if not is_first_question(chat_history) or len(context_cards) != 1:
+        return None
+    card = context_cards[0]
+    bill_id = str(card.get('id', ''))
+    version = card.get('xml link', '')
+
+    if is_explain_question(user_message):
+        explainer = get_bill_explainer(bill_id, version)
+        if explainer:
+            return explainer
+    return get_cached_answer(bill_id, version, user_message, profile_key(demographics))
+
+
+def card_matches_bill(card):
+    """
+    Whether a context card's title, description and XML link are the ones
+    stored for the bill. Cards come from the client, so answers built from a
+    card are only shared through the answer cache when they match.
+    """
+    bill_id = str(card.get('id', ''))
+    if _db is None or not bill_id:
+        return False
+    try:
+        bill_doc = _db.collection('bills').document(bill_id).get()
+    except Exception as e:
+        print(f"Error loading bill {bill_id} to check a context card: {e}")
+        return False
+    if not bill_doc.exists:
+        return False
+    bill_data = bill_doc.to_dict()
+    # Same defaults as serialize_bill, which the frontend's cards come from
+    return (card.get('title') == bill_data.get('title', 'No title available')
+            and card.get('description') == bill_data.get('summary', 'No description available')
+            and card.get('xml link', '') == bill_data.get('xml link', ''))
+
+
+def get_chat_user():
+    """
+    Key used for per-user admission control: the uid from a verified Firebase
+    ID token ("Authorization: Bearer <token>"), else the client address.
+    Ids sent in the request body aren't trusted, since any client could
+    rotate them or borrow someone else's.
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        try:
+            return f"uid:{firebase_auth.verify_id_token(header[len('Bearer '):])['uid']}"
+        except (ValueError, FirebaseError) as e:
+            print(f"Ignoring invalid chat ID token: {e}")
+    return f"ip:{request.remote_addr}"
+
+
+def admission_rejected_response(error):
+    response = jsonify({"error": str(error)})
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+
+def generate_chat_response(user_message, context, context_cards, chat_history):
+    """Scrape the selected bills, build the prompt and ask Groq for a reply"""
+    # Build context string for the prompt
+    context_str = ""
+    
+    # Add demographic context
+    demographics = context.get('demographics', {})
+    if demographics:
+        context_str += f"\nUser Demographics: {demographics}\n"
+    
+    # Add context cards (selected bills) with XML content
+    if context_cards:
+        context_str += "\nRelevant Bills Context:\n"
+        for card in context_cards:
+            bill_id = card.get('id', '')
+            title = card.get('title', '')
+            description = card.get('description', '')
+            
+            # Try to get XML content from the stored XML link
+            xml_content = None
+            xml_link = card.get('xml link', '')
+            
+            if xml_link:
+                # Use the stored XML link from Firestore
+                xml_content = scrape_xml_content(xml_link)
+                if xml_content is None:
+                    print(f"Failed to scrape XML content for bill {bill_id} from {xml_link}")
+            else:
+                print(f"No XML link found for bill {bill_id}")
+            
+            # Use XML content if available, otherwise fall back to description
+            context_str += build_bill_context(bill_id, title, description, xml_content)
+    
+    # Create the full prompt with context
+    with profile_phase('prompt_build'):
+        system_message = build_system_message(context_str)
+
+    user_prompt = f"{user_message}"
+    
+    # Build message history
+    messages = [
+        {"role": "system", "content": system_message}
+    ]
+    
+    # Add chat history (excluding system messages)
+    for msg in chat_history:
+        if msg.get('sender') == 'user':
+            messages.append({"role": "user", "content": msg.get('text', '')})
+        elif msg.get('sender') == 'bot':
+            messages.append({"role": "assistant", "content": msg.get('text', '')})
+    
+    # Add current user message
+    messages.append({"role": "user", "content": user_prompt})
+    
+    # Generate response using Groq
+    with profile_phase('llm'):
         response = groq_client.chat.completions.create(
             model="llama-3.1-8b-instant",
             messages=messages
         )
+    
+    return response.choices[0].message.content
+
+
+@chatbot_bp.route('/api/chatbot/message', methods=['POST'])
+def send_message():
+    """Handle chatbot message endpoint"""
+    try:
+        data = request.json
+        user_message = data.get('message', '')
+        user_id = get_chat_user()
         
-        bot_response = response.choices[0].message.content
+        # Get context (bills data, demographics, etc.)
+        context = data.get('context', {})
+        context_cards = context.get('contextCards', [])
+        chat_history = data.get('chatHistory', [])
+
+        chat_admission.check_request(user_id)
+
+        # Serve repeated questions without scraping or an LLM call
+        with profile_phase('answer_cache'):
+            instant_answer = get_instant_answer(user_message, chat_history, context_cards,
+                                                context.get('demographics', {}))
+        if instant_answer:
+            return jsonify({
+                "success": True,
+                "response": instant_answer,
+                "cached": True
+            })
+
+        # Wait for a fair share of the LLM capacity before doing the expensive work
+        prompt_tokens = estimate_prompt_tokens(user_message, chat_history, context)
+        with chat_admission.admit(user_id, prompt_tokens):
+            bot_response = generate_chat_response(user_message, context, context_cards, chat_history)
+
+        # Remember first-turn answers about a single bill for the next person who asks
+        if is_first_question(chat_history) and len(context_cards) == 1:
+            card = context_cards[0]
+            with profile_phase('answer_cache'):
+                if card_matches_bill(card):
+                    store_answer(str(card.get('id', '')), card.get('xml link', ''), user_message, bot_response,
+                                 profile_key(context.get('demographics', {})))
         
         return jsonify({
             "success": True,
             "response": bot_response
         })
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
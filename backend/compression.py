@@ -0,0 +1,62 @@
+import gzip
+
+from flask import request
+
+# brotli is optional - fall back to gzip when it isn't installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this aren't worth the CPU to compress
+MIN_COMPRESS_SIZE = 500
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+def _accepted_encodings():
+    """Return the set of content codings the client will accept"""
+    header = request.headers.get('Accept-Encoding', '')
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def compress_response(response):
+    """Compress a JSON/text response with brotli or gzip based on Accept-Encoding"""
+    if response.direct_passthrough or response.status_code < 200 or response.status_code >= 300:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    accepted = _accepted_encodings()
+    if brotli is not None and 'br' in accepted:
+        compressed = brotli.compress(body, quality=5)
+        encoding = 'br'
+    elif 'gzip' in accepted:
+        compressed = gzip.compress(body, compresslevel=6)
+        encoding = 'gzip'
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_compression(app):
+    """Register the response compression hook on the Flask app"""
+    app.after_request(compress_response)
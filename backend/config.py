@@ -4,3 +4,25 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     PORT = int(os.environ.get('PORT', 8000))
+    SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bills_search.db'))
+    JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.db'))
+    # Request profiling: send "X-Profile: <PROFILE_TOKEN>" to profile one request,
+    # or set PROFILE_SAMPLE_RATE (0-1) to profile a fraction of all requests
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+    # Only the newest PROFILE_MAX_COUNT profiles are kept in PROFILE_DIR
+    PROFILE_MAX_COUNT = int(os.environ.get('PROFILE_MAX_COUNT', 200))
+    # Fraction of bills also categorized by the LLM alone, to measure how well
+    # the rule-based demographic extractor agrees with it
+    RULES_SHADOW_RATE = float(os.environ.get('RULES_SHADOW_RATE', 0.05))
+    # Chatbot admission control (per user_id)
+    CHAT_MAX_CONCURRENT = int(os.environ.get('CHAT_MAX_CONCURRENT', 8))
+    CHAT_QUEUE_MAX = int(os.environ.get('CHAT_QUEUE_MAX', 32))
+    CHAT_QUEUE_PER_USER = int(os.environ.get('CHAT_QUEUE_PER_USER', 2))
+    CHAT_MAX_WAIT_SECONDS = float(os.environ.get('CHAT_MAX_WAIT_SECONDS', 15))
+    CHAT_REQUESTS_PER_MINUTE = float(os.environ.get('CHAT_REQUESTS_PER_MINUTE', 20))
+    CHAT_REQUEST_BURST = int(os.environ.get('CHAT_REQUEST_BURST', 5))
+    CHAT_TOKENS_PER_MINUTE = float(os.environ.get('CHAT_TOKENS_PER_MINUTE', 30000))
+    CHAT_MAX_PROMPT_TOKENS = int(os.environ.get('CHAT_MAX_PROMPT_TOKENS', 12000))
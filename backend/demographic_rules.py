@@ -0,0 +1,276 @@
+import re
+from collections import defaultdict
+from datetime import datetime
+
+# This will be set when the app starts
+_db = None
+
+AGREEMENT_COLLECTION = 'demographic_rule_agreement'
+
+# Fields categorize_population fills, in prompt order
+CATEGORY_FIELDS = ['age_groups', 'income_brackets', 'race_or_ethnicity', 'location', 'gender']
+
+STATES = [
+    'Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado', 'Connecticut', 'Delaware',
+    'Florida', 'Georgia', 'Hawaii', 'Idaho', 'Illinois', 'Indiana', 'Iowa', 'Kansas', 'Kentucky',
+    'Louisiana', 'Maine', 'Maryland', 'Massachusetts', 'Michigan', 'Minnesota', 'Mississippi',
+    'Missouri', 'Montana', 'Nebraska', 'Nevada', 'New Hampshire', 'New Jersey', 'New Mexico',
+    'New York', 'North Carolina', 'North Dakota', 'Ohio', 'Oklahoma', 'Oregon', 'Pennsylvania',
+    'Rhode Island', 'South Carolina', 'South Dakota', 'Tennessee', 'Texas', 'Utah', 'Vermont',
+    'Virginia', 'Washington', 'West Virginia', 'Wisconsin', 'Wyoming'
+]
+
+INCOME_BRACKETS = [
+    ('$0-11,600', 0),
+    ('$11,601-47,150', 11601),
+    ('$47,151-100,525', 47151),
+    ('$100,526+', 100526)
+]
+
+# Age brackets as inclusive year ranges. The vocabulary's labels overlap at 25
+# and 65, so each age belongs to exactly one bracket here.
+AGE_BRACKETS = [
+    ('0-18', 0, 18),
+    ('19-25', 19, 25),
+    ('25-40', 26, 40),
+    ('41-65', 41, 64),
+    ('65+', 65, 200)
+]
+
+# Longest names first so "West Virginia" wins over "Virginia". State names are
+# matched case-sensitively; "Washington" is skipped when it means D.C. or a
+# person, and "Alaska" when it is part of "Alaska Native".
+_STATE = (
+    r'(?:' + '|'.join(re.escape(s) for s in sorted(STATES, key=len, reverse=True)) + r')\b'
+    r'(?!,? D\.?C\b)(?! Natives?\b)'
+)
+_STATE_PATTERN = re.compile(r'(?<!George )\b' + _STATE)
+
+# A state named as a place: "in Ohio", "throughout the State of Texas",
+# "in Texas, Oklahoma, and Kansas"
+_LOCATED_STATES_PATTERN = re.compile(
+    r'\b(?i:in|within|across|throughout|residents of|(?:state|commonwealth) of)\s+'
+    r'(?:the (?i:state|commonwealth) of\s+)?'
+    r'(' + _STATE + r'(?:(?:,\s*|,?\s+(?:and|or)\s+)' + _STATE + r')*)'
+)
+_LIST_SEPARATOR = re.compile(r',?\s+(?:and|or)\s+|,\s*')
+
+
+def _terms(*patterns):
+    return re.compile(r'\b(?:' + '|'.join(patterns) + r')\b', re.IGNORECASE)
+
+
+# (field, value, pattern): a match anywhere in the bill's title or summaries
+# suggests the value applies. A single word is weak evidence ("child tax
+# credit", "men and women of the Armed Forces"), so these are only passed to
+# the LLM as hints and never decide a field on their own.
+RULES = [
+    ('age_groups', '0-18', _terms(
+        r'children', r'child', r'kids', r'minors?', r'infants?', r'newborns?', r'toddlers?',
+        r'adolescents?', r'teen(?:ager)?s?', r'youth', r'juveniles?', r'K-12',
+        r'elementary (?:and|or) secondary', r'high school students?',
+        r'under (?:the )?age (?:of )?1[0-8]')),
+    ('age_groups', '19-25', _terms(
+        r'college students?', r'undergraduates?', r'young adults?', r'postsecondary students?')),
+    ('age_groups', '65+', _terms(
+        r'seniors?', r'senior citizens?', r'elderly', r'older (?:adults|Americans|individuals)',
+        r'retirees?', r'medicare beneficiar(?:y|ies)', r'aged? 6[2-9] (?:or|and) older')),
+    ('income_brackets', '$0-11,600', _terms(
+        r'low[- ]income', r'poverty', r'impoverished', r'SNAP', r'food stamps?', r'TANF',
+        r'supplemental nutrition assistance')),
+    ('income_brackets', '$11,601-47,150', _terms(r'low[- ]income', r'working families')),
+    ('income_brackets', '$47,151-100,525', _terms(r'middle[- ]class', r'middle[- ]income')),
+    ('income_brackets', '$100,526+', _terms(
+        r'high[- ]income', r'wealthy', r'millionaires?', r'billionaires?', r'high[- ]net[- ]worth')),
+    ('race_or_ethnicity', 'Hispanic or Latino', _terms(r'Hispanics?', r'Latin[oax]s?')),
+    ('race_or_ethnicity', 'Black or African American', _terms(
+        r'African[- ]Americans?',
+        r'Black (?:Americans|communities|individuals|families|farmers|students|women|men)')),
+    ('race_or_ethnicity', 'Asian', _terms(r'Asian[- ]Americans?', r'Asian (?:communities|individuals)')),
+    ('race_or_ethnicity', 'American Indian or Alaska Native', _terms(
+        r'American Indians?', r'Alaska Natives?', r'Native Americans?', r'Indian tribes?',
+        r'tribal (?:nations?|governments?|communities|members|lands?)')),
+    ('race_or_ethnicity', 'Native Hawaiian or Other Pacific Islander', _terms(
+        r'Native Hawaiians?', r'Pacific Islanders?')),
+    ('gender', 'Female', _terms(
+        r'women', r'woman', r'girls?', r'mothers?', r'maternal', r'pregnan(?:t|cy)', r'widows?')),
+    ('gender', 'Male', _terms(r'men', r'boys?', r'fathers?', r'paternal')),
+    # Stored under other_groups; the LLM confirms them like the other hints
+    ('other_groups', 'Veterans', _terms(
+        r'veterans?', r'service ?members?', r'armed forces', r'military families')),
+    ('other_groups', 'Students', _terms(r'students?', r'student loans?')),
+]
+
+# Eligibility limits on a person's or household's income: "household income of
+# not more than $50,000", "whose annual income does not exceed $40,000". The
+# limit must directly follow the income, so amounts of a tax, credit,
+# deduction or exclusion ("an income tax credit of up to $2,000", "exclude from
+# gross income up to $10,000") don't count.
+_INCOME_LIMIT_PATTERN = re.compile(
+    r'\b(?:(?:modified )?adjusted gross income|(?:household|family|annual|individual) income'
+    r'|whose (?:(?:household|family|annual|total) )?income)'
+    r'(?: (?:of|is|that is))? '
+    r'(?:(?:does|do) not exceed|not (?:more|greater) than|not in excess of|below|less than|under|at or below) '
+    r'\$([\d,]{4,})',
+    re.IGNORECASE
+)
+
+# Numeric age thresholds, as (pattern, function of the matched numbers -> (low, high))
+_AGE_LIMIT_PATTERNS = [
+    (re.compile(r'\bbetween (?:the )?ages? (?:of )?(\d{1,2}) and (\d{1,2})', re.IGNORECASE),
+     lambda low, high: (int(low), int(high))),
+    (re.compile(r'\b(?:under|below) (?:the )?age (?:of )?(\d{1,2})\b', re.IGNORECASE),
+     lambda age: (0, int(age) - 1)),
+    (re.compile(r'\b(?:under|younger than|less than) (\d{1,2}) years (?:of age|old)', re.IGNORECASE),
+     lambda age: (0, int(age) - 1)),
+    (re.compile(r'\b(?:aged?|ages) (\d{1,2}) (?:years )?(?:or|and) (?:older|over|above)', re.IGNORECASE),
+     lambda age: (int(age), 200)),
+    (re.compile(r'\b(\d{1,2}) years (?:of age |old )?(?:or|and) (?:older|over)', re.IGNORECASE),
+     lambda age: (int(age), 200)),
+    (re.compile(r'\b(?:over|older than) (?:the )?age (?:of )?(\d{1,2})\b', re.IGNORECASE),
+     lambda age: (int(age) + 1, 200)),
+]
+
+
+def init_demographic_rules(db_instance):
+    """Initialize the database instance used to record rule/LLM agreement"""
+    global _db
+    _db = db_instance
+
+
+def _strip_html(text):
+    return re.sub(r'<[^>]+>', ' ', text or '')
+
+
+def _income_brackets_up_to(limit):
+    return [name for name, lower in INCOME_BRACKETS if lower <= limit]
+
+
+def _age_brackets_between(low, high):
+    return [name for name, lower, upper in AGE_BRACKETS if lower <= high and upper >= low]
+
+
+def _located_states(text):
+    """State names used as places. "in Washington, Georgia" is a town in Georgia, not two states."""
+    states = []
+    for match in _LOCATED_STATES_PATTERN.finditer(text):
+        names = _LIST_SEPARATOR.split(match.group(1))
+        if len(names) == 2 and not re.search(r'\b(?:and|or)\b', match.group(1)):
+            names = names[1:]
+        states.extend(names)
+    return states
+
+
+def extract_demographics(*texts):
+    """
+    Find demographic values the bill states explicitly: state names used as
+    places, and numeric age and income limits. Returns {field: [values]} with
+    only the fields these rules could resolve; those fields skip the LLM.
+    """
+    text = ' '.join(_strip_html(t) for t in texts if t)
+    found = defaultdict(list)
+
+    def add(field, value):
+        if value not in found[field]:
+            found[field].append(value)
+
+    for state in _located_states(text):
+        add('location', state)
+
+    for pattern, age_range in _AGE_LIMIT_PATTERNS:
+        for match in pattern.finditer(text):
+            low, high = age_range(*match.groups())
+            for bracket in _age_brackets_between(low, high):
+                add('age_groups', bracket)
+
+    for match in _INCOME_LIMIT_PATTERN.finditer(text):
+        for bracket in _income_brackets_up_to(int(match.group(1).replace(',', ''))):
+            add('income_brackets', bracket)
+
+    # Keep the vocabulary order so stored values look like the LLM's output
+    for field, vocabulary in (('age_groups', AGE_BRACKETS), ('income_brackets', INCOME_BRACKETS)):
+        if field in found:
+            order = {entry[0]: i for i, entry in enumerate(vocabulary)}
+            found[field].sort(key=lambda v: order.get(v, len(order)))
+    return dict(found)
+
+
+def keyword_hints(*texts):
+    """
+    Values suggested by keywords in the bill (any state name, "children",
+    "low-income", "veterans", ...). Returns {field: {value: matched term}}.
+    These are too loose to decide a field and are passed to the LLM instead.
+    """
+    text = ' '.join(_strip_html(t) for t in texts if t)
+    hints = defaultdict(dict)
+
+    for match in _STATE_PATTERN.finditer(text):
+        hints['location'].setdefault(match.group(0), match.group(0))
+
+    for field, value, pattern in RULES:
+        match = pattern.search(text)
+        if match:
+            hints[field].setdefault(value, match.group(0))
+    return dict(hints)
+
+
+def compare_fields(rule_fields, llm_fields):
+    """Per-field agreement between rule and LLM values, for the fields the rules resolved"""
+    comparison = {}
+    for field, rule_values in rule_fields.items():
+        if field not in CATEGORY_FIELDS:
+            continue
+        llm_values = llm_fields.get(field) or []
+        rule_set, llm_set = set(rule_values), set(llm_values)
+        comparison[field] = {
+            'rules': sorted(rule_set),
+            'llm': sorted(llm_set),
+            'exact': rule_set == llm_set,
+            # Share of rule values the LLM also picked
+            'precision': len(rule_set & llm_set) / len(rule_set) if rule_set else 1.0
+        }
+    return comparison
+
+
+def record_agreement(bill_id, rule_fields, llm_fields):
+    """Store how the rules compared to a full LLM categorization of the same bill"""
+    comparison = compare_fields(rule_fields, llm_fields)
+    for field, result in comparison.items():
+        print(f"Rules vs LLM for bill {bill_id} {field}: rules={result['rules']} llm={result['llm']}")
+    if _db is None or not comparison:
+        return comparison
+    try:
+        _db.collection(AGREEMENT_COLLECTION).document(str(bill_id)).set({
+            'fields': comparison,
+            'recorded_at': datetime.now()
+        })
+    except Exception as e:
+        print(f"Error recording rule agreement for bill {bill_id}: {e}")
+    return comparison
+
+
+def agreement_report():
+    """Aggregate agreement rates per field across all recorded bills"""
+    totals = defaultdict(lambda: {'bills': 0, 'exact': 0, 'precision': 0.0})
+    for doc in _db.collection(AGREEMENT_COLLECTION).stream():
+        for field, result in doc.to_dict().get('fields', {}).items():
+            totals[field]['bills'] += 1
+            totals[field]['exact'] += 1 if result.get('exact') else 0
+            totals[field]['precision'] += result.get('precision', 0.0)
+
+    report = {}
+    for field, total in totals.items():
+        report[field] = {
+            'bills': total['bills'],
+            'exact_agreement': round(total['exact'] / total['bills'], 3),
+            'mean_precision': round(total['precision'] / total['bills'], 3)
+        }
+    return report
+
+
+if __name__ == '__main__':
+    from app import db
+    init_demographic_rules(db)
+    for field, stats in sorted(agreement_report().items()):
+        print(f"{field}: {stats['bills']} bills, {stats['exact_agreement']:.1%} exact, "
+              f"{stats['mean_precision']:.1%} of rule values confirmed by the LLM")
@@ -0,0 +1,139 @@
+"""
+Standalone ingestion worker and job queue commands.
+
+Ingestion runs here, outside the web process. Queue bills with
+`enqueue-recent` (or `bulk_import.py --enqueue`) and run as many
+`work` processes as you like against the same JOB_QUEUE_PATH.
+
+Usage:
+    python ingest_worker.py enqueue-recent
+    python ingest_worker.py work [--once]
+    python ingest_worker.py stats
+    python ingest_worker.py requeue-dead
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+import job_queue
+from bulk_import import bill_document_id
+
+# Job kinds
+CONGRESS_BILL = 'congress_bill'  # a bill from the Congress API bill list
+PARSED_BILL = 'parsed_bill'      # a bill already parsed by bulk_import.py
+
+POLL_INTERVAL = 5
+
+_stopping = threading.Event()
+
+
+def enqueue_congress_bill(bill):
+    """Queue a bill from the Congress API bill list for ingestion"""
+    job_queue.enqueue(CONGRESS_BILL, bill_document_id(bill), bill)
+
+
+def enqueue_parsed_bill(bill):
+    """Queue a bill parsed from a BILLSTATUS archive for ingestion"""
+    job_queue.enqueue(PARSED_BILL, bill_document_id(bill), bill)
+
+
+def run_job(job):
+    """Ingest the bill described by a job"""
+    # Imported here so queue commands don't need Firebase/Groq credentials
+    from app import ingest_bill, ingest_congress_bill
+
+    payload = job['payload']
+    if job['kind'] == CONGRESS_BILL:
+        ingest_congress_bill(payload)
+    elif job['kind'] == PARSED_BILL:
+        ingest_bill(payload['number'], payload['title'], payload['description'], payload['summary'],
+                    payload['latest_action_date'], payload['xml_link'], bill_document_id(payload))
+    else:
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+def _keep_lease(job_id, owner, done):
+    """Renew the lease while a job runs so slow LLM calls don't get the job handed out twice"""
+    while not done.wait(job_queue.DEFAULT_LEASE_SECONDS / 3):
+        if not job_queue.renew_lease(job_id, owner):
+            print(f"Lost lease on job {job_id}")
+            return
+
+
+def work(once=False):
+    """Process jobs until stopped (or until the queue is empty with once=True)"""
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {owner} started")
+
+    while not _stopping.is_set():
+        job = job_queue.lease(owner)
+        if job is None:
+            if once:
+                break
+            _stopping.wait(POLL_INTERVAL)
+            continue
+
+        print(f"\nJob {job['id']} ({job['kind']} {job['job_key']}), attempt {job['attempts'] + 1}")
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_keep_lease, args=(job['id'], owner, done), daemon=True)
+        heartbeat.start()
+        try:
+            run_job(job)
+            job_queue.complete(job['id'], owner)
+        except Exception as e:
+            traceback.print_exc()
+            if job_queue.fail(job['id'], owner, e):
+                print(f"Job {job['id']} moved to dead letters after {job['attempts'] + 1} attempts")
+        finally:
+            done.set()
+
+    print(f"Worker {owner} stopped")
+
+
+def enqueue_recent():
+    """Queue the most recently updated bills from the Congress API"""
+    from app import fetch_recent_bills
+
+    bills_data = fetch_recent_bills()
+    if 'bills' not in bills_data:
+        print(f"Error: No bills found. Response: {bills_data}")
+        return 0
+    for bill in bills_data['bills']:
+        enqueue_congress_bill(bill)
+    print(f"Queued {len(bills_data['bills'])} bills")
+    return len(bills_data['bills'])
+
+
+def _stop(signum, frame):
+    print("Stopping after the current job...")
+    _stopping.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bill ingestion worker")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    work_parser = subparsers.add_parser('work', help="Process queued ingestion jobs")
+    work_parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+    subparsers.add_parser('enqueue-recent', help="Queue recently updated bills from the Congress API")
+    subparsers.add_parser('stats', help="Show job counts")
+    subparsers.add_parser('requeue-dead', help="Retry all dead-lettered jobs")
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        signal.signal(signal.SIGINT, _stop)
+        signal.signal(signal.SIGTERM, _stop)
+        work(once=args.once)
+    elif args.command == 'enqueue-recent':
+        enqueue_recent()
+    elif args.command == 'stats':
+        print(job_queue.stats())
+    elif args.command == 'requeue-dead':
+        print(f"Requeued {job_queue.requeue_dead_letters()} jobs")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+import json
+import random
+import sqlite3
+import time
+
+from config import Config
+
+# Retry delays grow as BACKOFF_BASE * 2^attempts seconds, capped at BACKOFF_MAX
+BACKOFF_BASE = 30
+BACKOFF_MAX = 60 * 60
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE_SECONDS = 10 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    last_error TEXT,
+    -- Set when the job is enqueued again while leased: the running worker has
+    -- the old payload, so the job goes back on the queue when it finishes
+    dirty INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, job_key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY,
+    job_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+_schema_ready = False
+
+
+def _connect():
+    """Open a connection to the job queue, creating the schema on first use"""
+    global _schema_ready
+    # isolation_level=None so transactions are controlled with explicit BEGIN IMMEDIATE
+    conn = sqlite3.connect(Config.JOB_QUEUE_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if 'dirty' not in columns:
+            # Queue files created before the column existed
+            conn.execute("ALTER TABLE jobs ADD COLUMN dirty INTEGER NOT NULL DEFAULT 0")
+        _schema_ready = True
+    return conn
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retrying a job that has failed `attempts` times"""
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    # Jitter so jobs that failed together (e.g. a rate limit) don't retry together
+    return delay * random.uniform(0.8, 1.2)
+
+
+def enqueue(kind, job_key, payload, max_attempts=DEFAULT_MAX_ATTEMPTS, delay=0):
+    """
+    Add a job, or refresh the payload of the existing job with the same
+    kind and key. A finished job with the same key is queued again, and a
+    leased one is queued again once its worker is done with the old payload.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            INSERT INTO jobs (kind, job_key, payload, max_attempts, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (kind, job_key) DO UPDATE SET
+                payload = excluded.payload,
+                max_attempts = excluded.max_attempts,
+                status = CASE WHEN jobs.status = 'leased' THEN 'leased' ELSE 'queued' END,
+                dirty = CASE WHEN jobs.status = 'leased' THEN 1 ELSE 0 END,
+                attempts = CASE WHEN jobs.status = 'done' THEN 0 ELSE jobs.attempts END,
+                available_at = CASE WHEN jobs.status = 'done' THEN excluded.available_at ELSE jobs.available_at END,
+                updated_at = excluded.updated_at
+            """,
+            (kind, str(job_key), json.dumps(payload), max_attempts, now + delay, now, now)
+        )
+    finally:
+        conn.close()
+
+
+def _dead_letter(conn, row, attempts, error, now):
+    """Move a job row to dead_letters (inside the caller's transaction)"""
+    conn.execute(
+        "INSERT INTO dead_letters (job_id, kind, job_key, payload, attempts, last_error, failed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (row['id'], row['kind'], row['job_key'], row['payload'], attempts, str(error), now)
+    )
+    conn.execute("DELETE FROM jobs WHERE id = ?", (row['id'],))
+
+
+def lease(owner, kinds=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claim the next ready job for `owner`. Jobs whose lease expired (the
+    worker died or hung) are handed out again and the lost run counts as a
+    failed attempt, so a job that keeps killing its worker is eventually
+    dead-lettered. Returns the job as a dict or None.
+    """
+    now = time.time()
+    kind_filter = ''
+    params = [now, now]
+    if kinds:
+        kind_filter = f"AND kind IN ({', '.join('?' for _ in kinds)})"
+        params.extend(kinds)
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        while True:
+            row = conn.execute(
+                f"""
+                SELECT * FROM jobs
+                WHERE ((status = 'queued' AND available_at <= ?)
+                       OR (status = 'leased' AND lease_expires_at <= ?))
+                {kind_filter}
+                ORDER BY available_at
+                LIMIT 1
+                """,
+                params
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            attempts = row['attempts']
+            if row['status'] == 'leased':
+                attempts += 1
+                if attempts >= row['max_attempts']:
+                    _dead_letter(conn, row, attempts, f"Lease expired (held by {row['lease_owner']})", now)
+                    continue
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = ?, dirty = 0, lease_owner = ?, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (attempts, owner, now + lease_seconds, now, row['id'])
+            )
+            break
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    job = dict(row)
+    job['attempts'] = attempts
+    job['payload'] = json.loads(job['payload'])
+    return job
+
+
+def renew_lease(job_id, owner, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Extend a lease for a long-running job. Returns False if the lease was lost."""
+    now = time.time()
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, owner)
+        )
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def complete(job_id, owner):
+    """Mark a leased job as done, or queue it again if a newer payload arrived while it ran"""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute(
+            """
+            UPDATE jobs SET
+                status = CASE WHEN dirty THEN 'queued' ELSE 'done' END,
+                attempts = 0,
+                available_at = CASE WHEN dirty THEN ? ELSE available_at END,
+                dirty = 0, lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (now, now, job_id, owner)
+        )
+    finally:
+        conn.close()
+
+
+def fail(job_id, owner, error):
+    """
+    Record a failed attempt. The job is retried with exponential backoff
+    until it runs out of attempts, then moved to the dead_letters table.
+    Returns True if the job was dead-lettered.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT * FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)).fetchone()
+        if row is None:
+            # Lease expired and another worker took the job over
+            conn.execute("COMMIT")
+            return False
+
+        if row['dirty']:
+            # The failure was with the old payload; the new one gets a fresh start
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, dirty = 0, available_at = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                (now, str(error), now, job_id)
+            )
+            conn.execute("COMMIT")
+            return False
+
+        attempts = row['attempts'] + 1
+        dead = attempts >= row['max_attempts']
+        if dead:
+            _dead_letter(conn, row, attempts, error, now)
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                (attempts, now + backoff_delay(attempts), str(error), now, job_id)
+            )
+        conn.execute("COMMIT")
+        return dead
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def requeue_dead_letters(kind=None):
+    """Move dead-lettered jobs back onto the queue with a fresh set of attempts"""
+    conn = _connect()
+    try:
+        where = "WHERE kind = ?" if kind else ""
+        rows = conn.execute(f"SELECT * FROM dead_letters {where}", (kind,) if kind else ()).fetchall()
+    finally:
+        conn.close()
+
+    for row in rows:
+        enqueue(row['kind'], row['job_key'], json.loads(row['payload']))
+        conn = _connect()
+        try:
+            conn.execute("DELETE FROM dead_letters WHERE id = ?", (row['id'],))
+        finally:
+            conn.close()
+    return len(rows)
+
+
+def stats():
+    """Job counts by status, plus the number of dead letters"""
+    conn = _connect()
+    try:
+        counts = {row['status']: row['count'] for row in
+                  conn.execute("SELECT status, count(*) AS count FROM jobs GROUP BY status")}
+        counts['dead'] = conn.execute("SELECT count(*) FROM dead_letters").fetchone()[0]
+        return counts
+    finally:
+        conn.close()
@@ -0,0 +1,186 @@
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+from config import Config
+
+PROFILE_HEADER = 'X-Profile'
+MAX_STACK_DEPTH = 128
+PROFILE_EXTENSIONS = ('.folded', '.json')
+
+# Profiles are written by background threads; one at a time so pruning doesn't race
+_save_lock = threading.Lock()
+
+
+class RequestProfiler:
+    """
+    Samples the call stack of one request's thread at a fixed interval from a
+    background thread, and times named phases of the handler. Nothing is
+    instrumented, so the handler itself runs at full speed.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.phases = {}
+        self.current_phase = None
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.started_at = time.perf_counter()
+        self.duration = None
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[self._fold(frame)] += 1
+            self.samples += 1
+
+    def _fold(self, frame):
+        """Collapse a frame into a "root;...;leaf" line, the input format of flamegraph tools"""
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.reverse()
+        if self.current_phase:
+            # Group samples by phase at the root of the flamegraph
+            names.insert(0, f"[{self.current_phase}]")
+        return ';'.join(names)
+
+    def add_phase_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+def _should_profile():
+    token = request.headers.get(PROFILE_HEADER)
+    if token and Config.PROFILE_TOKEN and hmac.compare_digest(token, Config.PROFILE_TOKEN):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profile_phase(name):
+    """Time a named phase of the current request. Does nothing unless the request is profiled."""
+    profiler = g.get('profiler') if has_request_context() else None
+    if profiler is None:
+        yield
+        return
+
+    outer_phase = profiler.current_phase
+    profiler.current_phase = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add_phase_time(name, time.perf_counter() - started)
+        profiler.current_phase = outer_phase
+
+
+def _start_profile():
+    if not _should_profile():
+        return
+    profiler = RequestProfiler(threading.get_ident(), Config.PROFILE_INTERVAL_MS / 1000.0)
+    g.profiler = profiler
+    profiler.start()
+
+
+def _attach_profile_id(response):
+    profiler = g.get('profiler')
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = profiler.id
+    return response
+
+
+def _finish_profile(exc=None):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.stop()
+    # Write the files off the request thread
+    threading.Thread(target=_save_in_background, args=(profiler, request.method, request.path, exc),
+                     daemon=True).start()
+
+
+def _save_in_background(profiler, method, path, exc):
+    with _save_lock:
+        try:
+            save_profile(profiler, method, path, exc)
+            prune_profiles()
+        except OSError as e:
+            print(f"Error saving request profile: {e}")
+
+
+def prune_profiles(max_count=None):
+    """Delete the oldest profiles so at most max_count (default PROFILE_MAX_COUNT) remain"""
+    max_count = Config.PROFILE_MAX_COUNT if max_count is None else max_count
+    # File names start with a timestamp, so name order is age order
+    bases = sorted({os.path.splitext(name)[0] for name in os.listdir(Config.PROFILE_DIR)
+                    if name.endswith(PROFILE_EXTENSIONS)})
+    for base in bases[:max(len(bases) - max_count, 0)]:
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(Config.PROFILE_DIR, base + extension))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler, method, path, exc=None):
+    """
+    Write the folded stacks (<id>.folded, for flamegraph.pl / speedscope) and
+    a JSON summary with the per-phase breakdown (<id>.json) to PROFILE_DIR.
+    """
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(Config.PROFILE_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{profiler.id}")
+
+    with open(f"{base}.folded", 'w') as f:
+        for stack, count in profiler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    phase_total = sum(profiler.phases.values())
+    summary = {
+        'id': profiler.id,
+        'method': method,
+        'path': path,
+        'error': str(exc) if exc else None,
+        'duration_ms': round(profiler.duration * 1000, 2),
+        'interval_ms': profiler.interval * 1000,
+        'samples': profiler.samples,
+        'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in
+                      sorted(profiler.phases.items(), key=lambda item: -item[1])},
+        # Time not covered by any named phase (routing, serialization, ...)
+        'unattributed_ms': round(max(profiler.duration - phase_total, 0) * 1000, 2)
+    }
+    with open(f"{base}.json", 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Saved request profile {profiler.id} for {method} {path} ({summary['duration_ms']} ms)")
+
+
+def init_profiling(app):
+    """Register the request profiling hooks on the Flask app"""
+    app.before_request(_start_profile)
+    app.after_request(_attach_profile_id)
+    app.teardown_request(_finish_profile)
@@ -0,0 +1,268 @@
+import json
+import re
+import sqlite3
+import threading
+
+from flask import Blueprint, jsonify, request
+
+from config import Config
+from profiling import profile_phase
+
+search_bp = Blueprint('search', __name__)
+
+DEMOGRAPHIC_FIELDS = ['age_groups', 'income_brackets', 'race_or_ethnicity', 'location', 'gender', 'other_groups']
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 50
+
+# bm25() column weights, in bills_fts column order: a hit in the title
+# matters more than one in the population analysis
+BM25_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+
+SCHEMA = """
+-- bills_fts rows share their rowid with bill_meta.id
+CREATE VIRTUAL TABLE IF NOT EXISTS bills_fts USING fts5(
+    title,
+    summary,
+    description,
+    population_summary,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS bill_meta (
+    id INTEGER PRIMARY KEY,
+    bill_id TEXT NOT NULL UNIQUE,
+    latest_action_date TEXT,
+    xml_link TEXT,
+    demographics TEXT
+);
+CREATE TABLE IF NOT EXISTS bill_demographics (
+    bill_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bill_demographics_lookup ON bill_demographics (field, value, bill_id);
+CREATE INDEX IF NOT EXISTS bill_demographics_bill ON bill_demographics (bill_id);
+"""
+
+_write_lock = threading.Lock()
+_schema_ready = False
+
+
+def _connect():
+    """Open a connection to the search index, creating the schema on first use"""
+    global _schema_ready
+    conn = sqlite3.connect(Config.SEARCH_INDEX_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _schema_ready = True
+    return conn
+
+
+def _strip_html(text):
+    """CRS summaries are stored as HTML; index only their text"""
+    if not text:
+        return ''
+    return re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', str(text))).strip()
+
+
+def _write_bill(conn, bill_id, title, summary, description, population_summary, demographics, latest_action_date, xml_link):
+    bill_id = str(bill_id)
+    demographics = demographics if isinstance(demographics, dict) else {}
+
+    existing = conn.execute("SELECT id FROM bill_meta WHERE bill_id = ?", (bill_id,)).fetchone()
+    if existing:
+        row_id = existing['id']
+        conn.execute("DELETE FROM bills_fts WHERE rowid = ?", (row_id,))
+        conn.execute("DELETE FROM bill_demographics WHERE bill_id = ?", (bill_id,))
+        conn.execute(
+            "UPDATE bill_meta SET latest_action_date = ?, xml_link = ?, demographics = ? WHERE id = ?",
+            (str(latest_action_date or ''), xml_link or '', json.dumps(demographics), row_id)
+        )
+    else:
+        row_id = conn.execute(
+            "INSERT INTO bill_meta (bill_id, latest_action_date, xml_link, demographics) VALUES (?, ?, ?, ?)",
+            (bill_id, str(latest_action_date or ''), xml_link or '', json.dumps(demographics))
+        ).lastrowid
+    conn.execute(
+        "INSERT INTO bills_fts (rowid, title, summary, description, population_summary) VALUES (?, ?, ?, ?, ?)",
+        (row_id, title or '', _strip_html(summary), description or '', population_summary or '')
+    )
+    rows = []
+    for field, values in demographics.items():
+        for value in (values if isinstance(values, list) else [values]):
+            if value:
+                rows.append((bill_id, field, str(value)))
+    conn.executemany("INSERT INTO bill_demographics (bill_id, field, value) VALUES (?, ?, ?)", rows)
+
+
+def index_bills(bills, replace=False):
+    """
+    Insert or replace many bills in one transaction. Each item is a tuple of
+    index_bill's arguments. With replace=True every other bill is dropped from
+    the index in the same transaction.
+    """
+    with _write_lock:
+        conn = _connect()
+        try:
+            with conn:
+                if replace:
+                    conn.execute("DELETE FROM bills_fts")
+                    conn.execute("DELETE FROM bill_demographics")
+                    conn.execute("DELETE FROM bill_meta")
+                count = 0
+                for bill in bills:
+                    _write_bill(conn, *bill)
+                    count += 1
+        finally:
+            conn.close()
+    return count
+
+
+def index_bill(bill_id, title, summary, description, population_summary, demographics, latest_action_date, xml_link):
+    """Insert or replace a bill in the search index. Called whenever a bill is stored."""
+    index_bills([(bill_id, title, summary, description, population_summary, demographics, latest_action_date, xml_link)])
+
+
+def build_match_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression. Every word must match;
+    the last word is a prefix so partially typed queries still hit.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_bills(query, demographics=None, limit=DEFAULT_RESULTS, offset=0):
+    """
+    BM25-ranked full text search over titles, summaries and population
+    analysis. If demographics are given, only bills matching at least one
+    of the values are returned (same rule as /api/data).
+    Returns (results, has_more).
+    """
+    match = build_match_query(query)
+    if match is None:
+        return [], False
+
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    where = ["bills_fts MATCH ?", "rank MATCH ?"]
+    params = [match, f"bm25({weights})"]
+    demographic_clauses = []
+    for field, values in (demographics or {}).items():
+        if field == 'other_groups' or not values:
+            continue
+        placeholders = ', '.join('?' for _ in values)
+        demographic_clauses.append(f"(field = ? AND value IN ({placeholders}))")
+        params.extend([field] + list(values))
+    if demographic_clauses:
+        where.append(f"bill_meta.bill_id IN (SELECT bill_id FROM bill_demographics WHERE {' OR '.join(demographic_clauses)})")
+
+    conn = _connect()
+    try:
+        # Fetch one extra row to know whether there is another page
+        with profile_phase('search_query'):
+            rows = conn.execute(
+                f"""
+                SELECT bill_meta.bill_id AS bill_id,
+                       bills_fts.title AS title,
+                       bills_fts.description AS description,
+                       snippet(bills_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                       rank,
+                       bill_meta.latest_action_date AS latest_action_date,
+                       bill_meta.xml_link AS xml_link,
+                       bill_meta.demographics AS demographics
+                FROM bills_fts
+                JOIN bill_meta ON bill_meta.id = bills_fts.rowid
+                WHERE {' AND '.join(where)}
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit + 1, offset]
+            ).fetchall()
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    results = []
+    for row in rows[:limit]:
+        results.append({
+            'id': row['bill_id'],
+            'title': row['title'],
+            'description': row['description'],
+            'update_date': row['latest_action_date'] or 'N/A',
+            'categorized_populations': json.loads(row['demographics']) if row['demographics'] else {},
+            'bill_number': row['bill_id'],
+            'xml link': row['xml_link'] or '',
+            'snippet': row['snippet'],
+            # bm25() is lower-is-better; flip it so clients can treat it as a score
+            'score': round(-row['rank'], 4)
+        })
+    return results, has_more
+
+
+def rebuild_index(db):
+    """
+    Replace the index with every bill in Firestore, e.g. after creating a
+    fresh index file. Bills deleted from Firestore are dropped.
+    """
+    def rows():
+        for bill_doc in db.collection('bills').stream():
+            bill_data = bill_doc.to_dict()
+            yield (
+                bill_doc.id,
+                bill_data.get('title'),
+                bill_data.get('original'),
+                bill_data.get('summary'),
+                bill_data.get('population affect summary'),
+                bill_data.get('demographics'),
+                bill_data.get('latest action date'),
+                bill_data.get('xml link')
+            )
+
+    # Read everything first so the index isn't locked while Firestore streams
+    count = index_bills(list(rows()), replace=True)
+    print(f"Indexed {count} bills")
+    return count
+
+
+@search_bp.route('/api/search', methods=['GET'])
+def search():
+    """Full text bill search with optional demographic filters"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Query parameter 'q' required"}), 400
+
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_RESULTS)), MAX_RESULTS))
+            offset = max(0, int(request.args.get('offset', 0)))
+        except ValueError:
+            return jsonify({"error": "limit and offset must be integers"}), 400
+
+        demographics = {}
+        for field in DEMOGRAPHIC_FIELDS:
+            value = request.args.get(field)
+            if value:
+                demographics[field] = [v.strip() for v in value.split(',') if v.strip()]
+
+        results, has_more = search_bills(query, demographics, limit, offset)
+
+        return jsonify({
+            "success": True,
+            "data": results,
+            "count": len(results),
+            "next_offset": offset + len(results) if has_more else None,
+            "filtered_by_demographics": any(demographics.values())
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+if __name__ == '__main__':
+    # Rebuild the local index from Firestore
+    from app import db
+    rebuild_index(db)
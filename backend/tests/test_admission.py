@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import AdmissionController, AdmissionRejected, FairScheduler, TokenBucket
+from config import Config
+
+
+def wait_for_queued(scheduler, count):
+    """Block until `count` requests are waiting for a slot"""
+    deadline = time.monotonic() + 5
+    while scheduler._queued < count:
+        assert time.monotonic() < deadline, "requests never queued"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(Config, 'CHAT_MAX_CONCURRENT', 1)
+    monkeypatch.setattr(Config, 'CHAT_QUEUE_MAX', 4)
+    monkeypatch.setattr(Config, 'CHAT_QUEUE_PER_USER', 2)
+    monkeypatch.setattr(Config, 'CHAT_MAX_WAIT_SECONDS', 0.05)
+    monkeypatch.setattr(Config, 'CHAT_REQUESTS_PER_MINUTE', 60)
+    monkeypatch.setattr(Config, 'CHAT_REQUEST_BURST', 3)
+    monkeypatch.setattr(Config, 'CHAT_TOKENS_PER_MINUTE', 6000)
+    monkeypatch.setattr(Config, 'CHAT_MAX_PROMPT_TOKENS', 5000)
+    return AdmissionController()
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=2, capacity=4)
+    now = bucket.updated
+
+    assert bucket.wait_time(4, now) == 0
+    bucket.consume(4)
+    assert bucket.wait_time(1, now) == pytest.approx(0.5)
+    assert bucket.wait_time(1, now + 0.5) == 0
+    # Never refills past capacity
+    assert bucket.wait_time(5, now + 100) == pytest.approx(0.5)
+
+
+def test_free_slots_are_granted_immediately():
+    scheduler = FairScheduler(2, 10, 10)
+
+    scheduler.acquire('a', timeout=0)
+    scheduler.acquire('a', timeout=0)
+    with pytest.raises(AdmissionRejected):
+        scheduler.acquire('b', timeout=0.01)
+
+
+def test_freed_slots_are_shared_round_robin():
+    scheduler = FairScheduler(1, 10, 10)
+    scheduler.acquire('holder', timeout=0)
+    order = []
+
+    def request(user):
+        scheduler.acquire(user, timeout=5)
+        order.append(user)
+        scheduler.release(0.01)
+
+    threads = []
+    # The heavy user queues first, then two light users
+    for number, user in enumerate(['heavy', 'heavy', 'heavy', 'a', 'b']):
+        thread = threading.Thread(target=request, args=(user,))
+        thread.start()
+        threads.append(thread)
+        wait_for_queued(scheduler, number + 1)
+
+    scheduler.release(0.01)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['heavy', 'a', 'b', 'heavy', 'heavy']
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = FairScheduler(1, max_queue=1, max_queue_per_user=5)
+    scheduler.acquire('holder', timeout=0)
+    waiter = threading.Thread(target=scheduler.acquire, args=('a', 5))
+    waiter.start()
+    wait_for_queued(scheduler, 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        scheduler.acquire('b', timeout=5)
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after >= 1
+
+    scheduler.release(0.01)
+    waiter.join(5)
+
+
+def test_per_user_queue_cap():
+    scheduler = FairScheduler(1, max_queue=10, max_queue_per_user=1)
+    scheduler.acquire('holder', timeout=0)
+    waiter = threading.Thread(target=scheduler.acquire, args=('a', 5))
+    waiter.start()
+    wait_for_queued(scheduler, 1)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        scheduler.acquire('a', timeout=5)
+    assert rejected.value.status == 429
+    # Another user can still queue
+    other = threading.Thread(target=scheduler.acquire, args=('b', 5))
+    other.start()
+    wait_for_queued(scheduler, 2)
+
+    scheduler.release(0.01)
+    scheduler.release(0.01)
+    waiter.join(5)
+    other.join(5)
+
+
+def test_request_rate_limit(controller):
+    for _ in range(3):
+        controller.check_request('a')
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_request('a')
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after == 1
+    # Other users have their own budget
+    controller.check_request('b')
+
+
+def test_prompt_token_budget(controller):
+    with controller.admit('a', 4000):
+        pass
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('a', 4000):
+            pass
+    assert rejected.value.status == 429
+    # 2000 more tokens at 100 tokens per second
+    assert 19 <= rejected.value.retry_after <= 21
+
+
+def test_timeout_refunds_tokens(controller):
+    controller.scheduler.acquire('holder', timeout=0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('a', 4000):
+            pass
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after >= 1
+
+    controller.scheduler.release(0.01)
+    _, bucket = controller._buckets('a')
+    assert bucket.wait_time(4000, time.monotonic()) == 0
+
+
+def test_oversized_prompt_is_413_without_retry_after(controller):
+    with pytest.raises(AdmissionRejected) as rejected:
+        with controller.admit('a', 5001):
+            pass
+    assert rejected.value.status == 413
+    assert rejected.value.retry_after is None
+
+    # Nothing was charged
+    _, bucket = controller._buckets('a')
+    assert bucket.wait_time(Config.CHAT_TOKENS_PER_MINUTE, time.monotonic()) == 0
+
+
+def test_slot_is_released_when_the_request_fails(controller):
+    with pytest.raises(RuntimeError):
+        with controller.admit('a', 10):
+            raise RuntimeError("LLM error")
+
+    with controller.admit('a', 10):
+        pass
+
+
+def test_estimate_prompt_tokens():
+    context = {'contextCards': [{'xml link': 'https://example.com/bill.xml'}, {'title': 'x' * 40}]}
+
+    tokens = admission.estimate_prompt_tokens('y' * 400, [{'text': 'z' * 400}], context)
+
+    assert tokens == admission.SYSTEM_PROMPT_TOKENS + 200 + admission.XML_CARD_TOKENS + 10
@@ -0,0 +1,67 @@
+import pytest
+
+import answer_cache
+
+
+@pytest.fixture(autouse=True)
+def memory_only(monkeypatch):
+    """Keep the cache in memory and start every test empty"""
+    monkeypatch.setattr(answer_cache, '_db', None)
+    monkeypatch.setattr(answer_cache, '_memory_cache', answer_cache.OrderedDict())
+
+
+def test_rephrased_question_hits_cache():
+    answer_cache.store_answer('1', 'v1', 'What does this bill do for students?', 'answer')
+
+    assert answer_cache.get_cached_answer('1', 'v1', 'what does the bill do for student') == 'answer'
+
+
+def test_question_about_another_state_misses():
+    answer_cache.store_answer(
+        '1', 'v1', 'How will this bill affect low income families with children living in Ohio', 'ohio')
+
+    assert answer_cache.get_cached_answer(
+        '1', 'v1', 'How will this bill affect low income families with children living in Texas') is None
+
+
+def test_negated_question_misses():
+    answer_cache.store_answer(
+        '1', 'v1', 'Will this bill raise federal income taxes for small business owners', 'raise')
+
+    assert answer_cache.get_cached_answer(
+        '1', 'v1', 'Will this bill not raise federal income taxes for small business owners') is None
+
+
+def test_question_with_another_number_misses():
+    answer_cache.store_answer('1', 'v1', 'Does this bill help people earning $40,000', 'answer')
+
+    assert answer_cache.get_cached_answer('1', 'v1', 'Does this bill help people earning $90,000') is None
+
+
+def test_other_version_or_profile_misses():
+    profile = answer_cache.profile_key({'location': ['Ohio'], 'age_groups': []})
+    answer_cache.store_answer('1', 'v1', 'Who benefits from this bill', 'answer', profile)
+
+    assert answer_cache.get_cached_answer('1', 'v1', 'Who benefits from this bill', profile) == 'answer'
+    assert answer_cache.get_cached_answer('1', 'v2', 'Who benefits from this bill', profile) is None
+    assert answer_cache.get_cached_answer('1', 'v1', 'Who benefits from this bill') is None
+
+
+def test_profile_key_ignores_order_and_empty_fields():
+    assert answer_cache.profile_key({}) == ''
+    assert answer_cache.profile_key({'gender': []}) == ''
+    assert (answer_cache.profile_key({'location': ['Ohio', 'Texas'], 'gender': []})
+            == answer_cache.profile_key({'location': ['Texas', 'Ohio']}))
+
+
+def test_invalidate_drops_old_versions():
+    answer_cache.store_answer('1', 'v1', 'Who benefits from this bill', 'old')
+
+    answer_cache.invalidate_bill('1', 'v2')
+
+    assert answer_cache.get_cached_answer('1', 'v1', 'Who benefits from this bill') is None
+
+
+def test_explain_questions():
+    assert answer_cache.is_explain_question('Can you explain this bill to me?')
+    assert not answer_cache.is_explain_question('Explain how this bill affects Ohio')
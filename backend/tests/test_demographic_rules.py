@@ -0,0 +1,77 @@
+from demographic_rules import compare_fields, extract_demographics, keyword_hints
+
+
+def test_loose_keywords_are_only_hints():
+    text = "Expands the child tax credit. Honors the men and women of the Armed Forces."
+
+    assert extract_demographics(text) == {}
+    hints = keyword_hints(text)
+    assert hints['age_groups'] == {'0-18': 'child'}
+    assert set(hints['gender']) == {'Male', 'Female'}
+    assert hints['other_groups'] == {'Veterans': 'Armed Forces'}
+
+
+def test_states_used_as_places():
+    found = extract_demographics("Provides grants to schools in Texas, Oklahoma, and Kansas and in the State of New York.")
+
+    assert found == {'location': ['Texas', 'Oklahoma', 'Kansas', 'New York']}
+
+
+def test_city_and_state_is_one_state():
+    assert extract_demographics("Designates the post office in Washington, Georgia.") == {'location': ['Georgia']}
+
+
+def test_state_names_outside_a_place_are_ignored():
+    assert extract_demographics("Amends the Georgia Act. Named for Virginia Smith.") == {}
+
+
+def test_washington_dc_is_not_a_state():
+    assert extract_demographics("Relocates agency offices in Washington, D.C.") == {}
+    assert extract_demographics("Relocates agency offices in Washington DC") == {}
+    assert extract_demographics("Renames a building at George Washington University") == {}
+
+
+def test_alaska_native_is_not_a_location():
+    assert extract_demographics("Funds housing in Alaska Native villages.") == {}
+    assert extract_demographics("Funds housing for Alaska Natives in Alaska.") == {'location': ['Alaska']}
+    assert 'American Indian or Alaska Native' in keyword_hints("Funds housing for Alaska Natives.")['race_or_ethnicity']
+
+
+def test_west_virginia_is_not_virginia():
+    assert extract_demographics("Builds a bridge in West Virginia.") == {'location': ['West Virginia']}
+
+
+def test_numeric_age_limits():
+    found = extract_demographics("Covers individuals under the age of 18 and adults aged 62 or older.")
+    assert found == {'age_groups': ['0-18', '41-65', '65+']}
+
+    assert extract_demographics("Applies to people between the ages of 19 and 30.") == {'age_groups': ['19-25', '25-40']}
+    assert extract_demographics("Individuals 65 years of age or older.") == {'age_groups': ['65+']}
+
+
+def test_income_eligibility_limits():
+    assert extract_demographics("Families whose income does not exceed $40,000 are eligible.") == {
+        'income_brackets': ['$0-11,600', '$11,601-47,150']}
+    assert extract_demographics("Taxpayers with adjusted gross income of not more than $75,000.") == {
+        'income_brackets': ['$0-11,600', '$11,601-47,150', '$47,151-100,525']}
+    assert extract_demographics("A household income below $10,000.") == {'income_brackets': ['$0-11,600']}
+
+
+def test_tax_amounts_are_not_income_limits():
+    assert extract_demographics("Allows an income tax credit of up to $2,000 per child.") == {}
+    assert extract_demographics("Excludes from gross income up to $10,000 of student loan forgiveness.") == {}
+    assert extract_demographics("Raises the deduction for income under $50,000.") == {}
+    assert extract_demographics("Lowers income tax rates for income below $50,000.") == {}
+
+
+def test_html_summaries_are_stripped():
+    assert extract_demographics("<p>Grants for farms <b>in</b> Iowa.</p>") == {'location': ['Iowa']}
+
+
+def test_compare_fields():
+    comparison = compare_fields({'location': ['Ohio'], 'other_groups': ['Veterans']},
+                                {'location': ['Ohio', 'Texas']})
+
+    assert list(comparison) == ['location']
+    assert comparison['location']['exact'] is False
+    assert comparison['location']['precision'] == 1.0
@@ -0,0 +1,197 @@
+import time
+
+import pytest
+
+import job_queue
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def queue_db(tmp_path, monkeypatch):
+    """Give every test its own empty queue file"""
+    monkeypatch.setattr(Config, 'JOB_QUEUE_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(job_queue, '_schema_ready', False)
+    # No jitter, so retry times are predictable
+    monkeypatch.setattr(job_queue.random, 'uniform', lambda a, b: 1.0)
+
+
+def expire_lease(job_id):
+    """Pretend the worker holding the job died long ago"""
+    conn = job_queue._connect()
+    try:
+        conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ?", (time.time() - 1, job_id))
+    finally:
+        conn.close()
+
+
+def make_ready(job_id):
+    """Skip the backoff delay of a failed job"""
+    conn = job_queue._connect()
+    try:
+        conn.execute("UPDATE jobs SET available_at = ? WHERE id = ?", (time.time() - 1, job_id))
+    finally:
+        conn.close()
+
+
+def test_lease_hands_out_each_job_once():
+    job_queue.enqueue('kind', 'a', {'n': 1})
+
+    job = job_queue.lease('worker-1')
+    assert job['job_key'] == 'a'
+    assert job['payload'] == {'n': 1}
+    assert job['attempts'] == 0
+    assert job_queue.lease('worker-2') is None
+
+
+def test_complete_marks_job_done():
+    job_queue.enqueue('kind', 'a', {})
+    job = job_queue.lease('worker-1')
+
+    job_queue.complete(job['id'], 'worker-1')
+
+    assert job_queue.lease('worker-1') is None
+    assert job_queue.stats() == {'done': 1, 'dead': 0}
+
+
+def test_enqueue_requeues_finished_job():
+    job_queue.enqueue('kind', 'a', {'v': 1})
+    job = job_queue.lease('worker-1')
+    job_queue.complete(job['id'], 'worker-1')
+
+    job_queue.enqueue('kind', 'a', {'v': 2})
+
+    job = job_queue.lease('worker-1')
+    assert job['payload'] == {'v': 2}
+    assert job['attempts'] == 0
+
+
+def test_failed_job_is_retried_after_backoff():
+    job_queue.enqueue('kind', 'a', {})
+    job = job_queue.lease('worker-1')
+
+    assert job_queue.fail(job['id'], 'worker-1', RuntimeError('boom')) is False
+
+    # Not ready until the backoff delay has passed
+    assert job_queue.lease('worker-1') is None
+    make_ready(job['id'])
+    job = job_queue.lease('worker-1')
+    assert job['attempts'] == 1
+    assert job['last_error'] == 'boom'
+
+
+def test_backoff_grows_and_is_capped():
+    assert job_queue.backoff_delay(1) == job_queue.BACKOFF_BASE
+    assert job_queue.backoff_delay(3) == job_queue.BACKOFF_BASE * 4
+    assert job_queue.backoff_delay(50) == job_queue.BACKOFF_MAX
+
+
+def test_job_is_dead_lettered_after_max_attempts():
+    job_queue.enqueue('kind', 'a', {}, max_attempts=2)
+
+    job = job_queue.lease('worker-1')
+    assert job_queue.fail(job['id'], 'worker-1', 'first') is False
+    make_ready(job['id'])
+    job = job_queue.lease('worker-1')
+    assert job_queue.fail(job['id'], 'worker-1', 'second') is True
+
+    assert job_queue.lease('worker-1') is None
+    assert job_queue.stats() == {'dead': 1}
+
+
+def test_expired_lease_is_reclaimed_and_counts_as_an_attempt():
+    job_queue.enqueue('kind', 'a', {})
+    job = job_queue.lease('worker-1')
+
+    assert job_queue.lease('worker-2') is None
+    expire_lease(job['id'])
+
+    reclaimed = job_queue.lease('worker-2')
+    assert reclaimed['id'] == job['id']
+    assert reclaimed['attempts'] == 1
+    # The old worker no longer owns the job
+    assert job_queue.renew_lease(job['id'], 'worker-1') is False
+    assert job_queue.fail(job['id'], 'worker-1', 'late') is False
+    assert job_queue.renew_lease(job['id'], 'worker-2') is True
+
+
+def test_job_that_keeps_losing_its_lease_is_dead_lettered():
+    job_queue.enqueue('kind', 'crashy', {}, max_attempts=3)
+    job_queue.enqueue('kind', 'fine', {})
+
+    job = job_queue.lease('worker-1')
+    assert job['job_key'] == 'crashy'
+    for attempt in (1, 2):
+        expire_lease(job['id'])
+        job = job_queue.lease(f'worker-{attempt + 1}')
+        assert job['job_key'] == 'crashy'
+        assert job['attempts'] == attempt
+
+    expire_lease(job['id'])
+    # The third lost lease dead-letters it and the next job is handed out instead
+    job = job_queue.lease('worker-4')
+    assert job['job_key'] == 'fine'
+    assert job_queue.stats() == {'leased': 1, 'dead': 1}
+
+
+def test_requeue_dead_letters_gives_fresh_attempts():
+    job_queue.enqueue('kind', 'a', {'v': 1}, max_attempts=1)
+    job = job_queue.lease('worker-1')
+    assert job_queue.fail(job['id'], 'worker-1', 'boom') is True
+
+    assert job_queue.requeue_dead_letters() == 1
+
+    job = job_queue.lease('worker-1')
+    assert job['payload'] == {'v': 1}
+    assert job['attempts'] == 0
+    assert job_queue.stats() == {'leased': 1, 'dead': 0}
+
+
+def test_lease_filters_by_kind():
+    job_queue.enqueue('one', 'a', {})
+    job_queue.enqueue('two', 'b', {})
+
+    job = job_queue.lease('worker-1', kinds=['two'])
+    assert job['kind'] == 'two'
+    assert job_queue.lease('worker-1', kinds=['two']) is None
+
+
+def test_enqueue_while_leased_runs_new_payload_after_complete():
+    job_queue.enqueue('kind', 'a', {'v': 1})
+    job = job_queue.lease('worker-1')
+
+    job_queue.enqueue('kind', 'a', {'v': 2})
+    # Still held by worker-1 until it finishes
+    assert job_queue.lease('worker-2') is None
+    job_queue.complete(job['id'], 'worker-1')
+
+    job = job_queue.lease('worker-2')
+    assert job['payload'] == {'v': 2}
+    job_queue.complete(job['id'], 'worker-2')
+    assert job_queue.lease('worker-2') is None
+    assert job_queue.stats() == {'done': 1, 'dead': 0}
+
+
+def test_enqueue_while_leased_survives_failure_of_old_payload():
+    job_queue.enqueue('kind', 'a', {'v': 1}, max_attempts=1)
+    job = job_queue.lease('worker-1')
+    job_queue.enqueue('kind', 'a', {'v': 2}, max_attempts=1)
+
+    # Would be dead-lettered, but the new payload hasn't been tried yet
+    assert job_queue.fail(job['id'], 'worker-1', 'boom') is False
+
+    job = job_queue.lease('worker-1')
+    assert job['payload'] == {'v': 2}
+    assert job['attempts'] == 0
+
+
+def test_old_queue_file_gets_dirty_column(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = tmp_path / 'old.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(job_queue.SCHEMA.replace("    dirty INTEGER NOT NULL DEFAULT 0,\n", ""))
+    conn.close()
+    monkeypatch.setattr(Config, 'JOB_QUEUE_PATH', str(path))
+
+    job_queue.enqueue('kind', 'a', {})
+    assert job_queue.lease('worker-1')['dirty'] == 0
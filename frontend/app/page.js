@@ -309,9 +309,14 @@ function MainApp() {
     const contextCards = getAddedContextCards()
     
     // Call the REST API endpoint with chat history
+    // The backend rate limits chat per verified user
+    const idToken = user ? await user.getIdToken() : null
     const response = await fetch('http://localhost:3001/api/chatbot/message', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: {
+        'Content-Type': 'application/json',
+        ...(idToken && { Authorization: `Bearer ${idToken}` })
+      },
       body: JSON.stringify({
         message: userMessage.text,
         chatHistory: chatMessages, // Send full chat history for context